@@ -22,6 +22,13 @@ with open("ejemplo.txt", "w") as archivo:
 with open("ejemplo.txt", "a") as archivo:
     archivo.write("Línea agregada con 'append'\n")
 
+# Para agregar muchas líneas (por ejemplo, un log) sin abrir el archivo en cada una:
+# EscritorBuffer (escritor_buffer.py) lo deja abierto y escribe de a muchas líneas.
+from escritor_buffer import EscritorBuffer
+
+with EscritorBuffer("ejemplo.txt") as archivo:
+    archivo.escribir("Línea agregada con EscritorBuffer\n")
+
 # -----------------------------------------------------
 # 3. LEER ARCHIVOS
 # -----------------------------------------------------
@@ -85,6 +92,18 @@ with open("archivo_binario.dat", "rb") as archivo:
     print("Datos binarios:")
     print(datos)
 
+# Registros de ancho fijo (por ejemplo, lecturas de sensores): registros_binarios.py
+# los empaqueta con struct y los lee por posición sin interpretar texto. Los valores
+# decimales se guardan en 4 bytes (float32): al leerlos 21.7 vuelve como 21.700000762939453.
+from registros_binarios import EscritorRegistros, LectorRegistros
+
+with EscritorRegistros("sensores.bin") as escritor:
+    escritor.escribir((1_790_000_000_000_000_000, 7, 21.5, 48.0, 1013.2))  # (marca_tiempo, sensor, temperatura, humedad, presion)
+    escritor.escribir((1_790_000_001_000_000_000, 7, 21.7, 47.5, 1013.1))
+
+with LectorRegistros("sensores.bin") as lector:
+    print(f"{len(lector)} registros; el segundo: {lector.registro(1)}")
+
 # -----------------------------------------------------
 # 7. GESTIÓN DE ARCHIVOS GRANDES
 # -----------------------------------------------------
@@ -95,6 +114,25 @@ with open("ejemplo.txt", "r") as archivo:
     for linea in archivo:
         print(linea.strip())
 
+# Ir directo a una línea sin leer las anteriores: LectorIndexado (lector_indexado.py)
+# abre el archivo con mmap y guarda en ejemplo.txt.idx dónde empieza cada línea.
+from lector_indexado import LectorIndexado
+
+with LectorIndexado("ejemplo.txt") as lector:
+    print(f"El archivo tiene {len(lector)} líneas; la última es: {lector.linea(len(lector) - 1)}")
+
+# Archivos comprimidos (.gz, .bz2, .xz, .zst): abrir() (comprimidos.py) se usa como open()
+# y los descomprime mientras se leen, sin archivos temporales.
+import gzip
+from comprimidos import abrir
+
+with gzip.open("ejemplo.txt.gz", "wt") as archivo:
+    archivo.write("Línea guardada con gzip\n")
+
+with abrir("ejemplo.txt.gz") as archivo:
+    for linea in archivo:
+        print(linea.strip())
+
 # -----------------------------------------------------
 # 8. EJEMPLO COMPLETO: PROCESAR UN ARCHIVO DE TEXTO
 # -----------------------------------------------------
@@ -112,6 +150,13 @@ with open("datos.txt", "r") as archivo:
         palabras = linea.split()
         print(f"Línea: {linea.strip()} - Palabras: {len(palabras)}")
 
+# Para archivos grandes: contar_palabras.py reparte el archivo entre varios procesos
+# y devuelve un resumen en vez de una línea por cada línea leída. Con un archivo tan
+# chico alcanza con un proceso (procesos=1 cuenta sin crear procesos hijos).
+from contar_palabras import contar_palabras, imprimir_resumen
+
+imprimir_resumen(contar_palabras("datos.txt", procesos=1, minusculas=True), top=3)
+
 # -----------------------------------------------------
 # 9. ELIMINAR O RENOMBRAR ARCHIVOS
 # -----------------------------------------------------
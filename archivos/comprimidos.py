@@ -0,0 +1,254 @@
+# -----------------------------------------------------
+# LECTURA TRANSPARENTE DE ARCHIVOS COMPRIMIDOS
+# -----------------------------------------------------
+# abrir() se usa como open() para leer, pero si el archivo está comprimido con gzip,
+# bzip2, xz o zstd lo descomprime mientras se lee, sin archivos temporales. El formato
+# se reconoce por los primeros bytes del archivo (no por la extensión), así que un
+# .log que en realidad es gzip también se lee bien; un archivo sin comprimir se abre
+# con open() directamente.
+#
+# Con hilo=True la descompresión corre en un hilo aparte que deja bloques ya
+# descomprimidos en una cola acotada, mientras el código que lee procesa las líneas.
+# zlib, bz2, lzma y zstd liberan el GIL mientras descomprimen, así que con más de una
+# CPU las dos cosas avanzan a la vez; con una sola el hilo solo agrega trabajo, y por
+# eso por defecto se usa cuando hay más de una CPU.
+#
+# zstd necesita compression.zstd (Python 3.14+) o el paquete zstandard.
+#
+# Uso:
+#   with abrir("app.log.gz", encoding="utf-8") as archivo:
+#       for linea in archivo:
+#           ...
+#   python comprimidos.py app.log.xz                 # cuenta las líneas
+#   python comprimidos.py --benchmark 200            # MB/s por formato con 200 MB de texto
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+import time
+
+# Primeros bytes de cada formato
+FIRMAS = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+TAMANO_BLOQUE = 1024 * 1024  # Bytes descomprimidos por bloque
+BLOQUES_EN_COLA = 8  # Bloques que el hilo puede adelantarse al lector
+
+_FIN = object()  # Marca el final del archivo en la cola
+
+
+def detectar_formato(ruta: str):
+    """
+    'gzip', 'bz2', 'xz' o 'zstd' según los primeros bytes del archivo, o None si no
+    está comprimido (o el formato no es ninguno de esos).
+    """
+    with open(ruta, 'rb') as archivo:
+        inicio = archivo.read(6)
+    for firma, formato in FIRMAS:
+        if inicio.startswith(firma):
+            return formato
+    return None
+
+
+def _abrir_zstd(ruta: str, modo: str = 'rb'):
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.open(ruta, modo)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"{ruta} está comprimido con zstd: instalar el paquete zstandard") from None
+    if 'r' in modo:
+        # read_across_frames: un .zst puede tener varios frames (por ejemplo, archivos concatenados)
+        lector = zstandard.ZstdDecompressor().stream_reader(open(ruta, 'rb'), read_across_frames=True, closefd=True)
+        return io.BufferedReader(lector, TAMANO_BLOQUE)  # El lector de zstandard no tiene readline()
+    return zstandard.ZstdCompressor().stream_writer(open(ruta, 'wb'), closefd=True)
+
+
+_ABRIR = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+    'zstd': _abrir_zstd,
+}
+
+
+class _LectorEnHilo(io.RawIOBase):
+    """Lee un archivo binario desde un hilo aparte y entrega los bloques por una cola."""
+    def __init__(self, origen, tamano_bloque: int, bloques_en_cola: int):
+        super().__init__()
+        self._origen = origen
+        self._tamano_bloque = tamano_bloque
+        self._cola = queue.Queue(bloques_en_cola)
+        self._actual = memoryview(b'')
+        self._terminado = False
+        self._error = None  # Error del hilo: se relanza en esta y en cada lectura siguiente
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._leer, name="Descompresion", daemon=True)
+        self._hilo.start()
+
+    def _poner(self, elemento) -> bool:
+        # Espera lugar en la cola, salvo que el lector se haya cerrado
+        while not self._detener.is_set():
+            try:
+                self._cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _leer(self) -> None:
+        try:
+            while True:
+                bloque = self._origen.read(self._tamano_bloque)
+                if not bloque:
+                    break
+                if not self._poner(bloque):
+                    return
+            self._poner(_FIN)
+        except Exception as error:  # Se relanza en el hilo que lee
+            self._poner(error)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        if not self._actual:
+            if self._error is not None:
+                raise self._error
+            if self._terminado:
+                return 0
+            elemento = self._cola.get()
+            if elemento is _FIN:
+                self._terminado = True
+                return 0
+            if isinstance(elemento, Exception):
+                self._error = elemento
+                raise elemento
+            self._actual = memoryview(elemento)
+        cantidad = min(len(destino), len(self._actual))
+        destino[:cantidad] = self._actual[:cantidad]
+        self._actual = self._actual[cantidad:]
+        return cantidad
+
+    def close(self) -> None:
+        if not self.closed:
+            self._detener.set()
+            self._hilo.join()
+            self._origen.close()
+        super().close()
+
+
+def abrir(ruta: str, modo: str = 'r', encoding: str = None, errors: str = None, newline: str = None,
+          hilo: bool = None, tamano_bloque: int = TAMANO_BLOQUE, bloques_en_cola: int = BLOQUES_EN_COLA):
+    """
+    Abre un archivo para leer como open(), descomprimiéndolo si hace falta.
+    Args:
+        ruta: Archivo, comprimido o no
+        modo: 'r' / 'rt' (texto) o 'rb' (bytes descomprimidos)
+        encoding, errors, newline: Como en open(), para el modo texto
+        hilo: Descomprimir en un hilo aparte (por defecto, si hay más de una CPU)
+        tamano_bloque: Bytes descomprimidos que el hilo entrega por vez
+        bloques_en_cola: Cuántos bloques puede adelantarse el hilo
+    """
+    if modo not in ('r', 'rt', 'rb'):
+        raise ValueError(f"abrir() solo lee archivos: modo {modo!r} no soportado")
+    binario = modo == 'rb'
+    formato = detectar_formato(ruta)
+    if formato is None:
+        return open(ruta, modo, encoding=encoding, errors=errors, newline=newline)
+    origen = _ABRIR[formato](ruta, 'rb')
+    if hilo is None:
+        hilo = (os.cpu_count() or 1) > 1
+    if hilo:
+        origen = io.BufferedReader(_LectorEnHilo(origen, tamano_bloque, bloques_en_cola), tamano_bloque)
+    if binario:
+        return origen
+    return io.TextIOWrapper(origen, encoding=encoding, errors=errors, newline=newline)
+
+
+# -----------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------
+
+def comprimir(ruta: str, destino: str, formato: str) -> None:
+    """
+    Comprime ruta en destino con formato ('gzip', 'bz2', 'xz' o 'zstd') con su nivel por defecto.
+    """
+    import shutil
+    with open(ruta, 'rb') as entrada, _ABRIR[formato](destino, 'wb') as salida:
+        shutil.copyfileobj(entrada, salida, TAMANO_BLOQUE)
+
+
+def benchmark(megabytes: float = 200) -> None:
+    """
+    MB/s (de texto descomprimido) al recorrer un log comprimido en cada formato, solo
+    leyendo las líneas y leyéndolas y separándolas en palabras, sin y con hilo.
+    """
+    import tempfile
+    from lector_indexado import generar_log
+
+    def recorrer(ruta, hilo, procesar):
+        palabras = 0
+        with abrir(ruta, encoding='utf-8', hilo=hilo) as archivo:
+            if procesar:
+                for linea in archivo:
+                    palabras += len(linea.split())
+            else:
+                for linea in archivo:
+                    pass
+        return palabras
+
+    with tempfile.TemporaryDirectory() as directorio:
+        original = os.path.join(directorio, 'app.log')
+        generar_log(original, megabytes / 1000)
+        tamano = os.path.getsize(original)
+        print(f"Log de {tamano / 1e6:.0f} MB, {os.cpu_count()} CPU(s); MB/s de texto descomprimido (sin hilo / con hilo)")
+        for formato in (None, 'gzip', 'bz2', 'xz', 'zstd'):
+            ruta = original
+            descripcion = 'sin comprimir: open() directo, el hilo no se usa'
+            if formato:
+                ruta = f"{original}.{formato}"
+                try:
+                    inicio = time.perf_counter()
+                    comprimir(original, ruta, formato)
+                except ImportError as error:
+                    print(f"  {formato:<5} {error}")
+                    continue
+                descripcion = f"{os.path.getsize(ruta) / 1e6:.0f} MB, comprimido en {time.perf_counter() - inicio:.0f}s"
+            velocidades = []
+            for procesar in (False, True):
+                for hilo in (False, True):
+                    inicio = time.perf_counter()
+                    recorrer(ruta, hilo, procesar)
+                    velocidades.append(tamano / 1e6 / (time.perf_counter() - inicio))
+            print(f"  {formato or '-':<5} leer: {velocidades[0]:5.0f} / {velocidades[1]:5.0f}   "
+                  f"leer + split(): {velocidades[2]:5.0f} / {velocidades[3]:5.0f}   ({descripcion})")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Lectura de archivos comprimidos")
+    parser.add_argument('ruta', nargs='?', help="Archivo (comprimido o no) cuyas líneas contar")
+    parser.add_argument('--benchmark', type=float, metavar='MB', help="MB/s por formato con un log de MB megabytes")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.ruta:
+        inicio = time.perf_counter()
+        with abrir(args.ruta, 'rb') as archivo:
+            lineas = sum(1 for _ in archivo)
+        print(f"{args.ruta}: {detectar_formato(args.ruta) or 'sin comprimir'}, {lineas:,} líneas "
+              f"({time.perf_counter() - inicio:.2f}s)")
+    else:
+        parser.print_help()
@@ -0,0 +1,218 @@
+# -----------------------------------------------------
+# CONTEO DE PALABRAS EN PARALELO
+# -----------------------------------------------------
+# El ejemplo 8 de archivos.py cuenta las palabras línea por línea en un solo bucle.
+# Para archivos grandes, contar_palabras divide el archivo en rangos de bytes que
+# terminan en un salto de línea, cuenta cada rango en un proceso aparte (cada uno
+# abre el archivo con mmap, así que no se copian datos entre procesos) y junta los
+# Counter parciales. El resultado es un resumen: líneas, palabras, palabras
+# distintas y las más frecuentes.
+#
+# Las palabras se separan como en archivos.py (str.split()); con --patron se
+# usa una expresión regular (por ejemplo r"\w+" para descartar la puntuación).
+#
+# Uso:
+#   python contar_palabras.py libro.txt                  # un proceso por CPU
+#   python contar_palabras.py libro.txt --procesos 4 --minusculas --top 20
+#   python contar_palabras.py --benchmark 1              # archivo de 1 GB
+
+import codecs
+import mmap
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+TAMANO_BLOQUE = 64 * 1024 * 1024  # Bytes que un proceso decodifica por vez
+
+
+def rangos_alineados(datos, inicio: int, fin: int, partes: int) -> list:
+    """
+    Divide datos[inicio:fin] en hasta partes rangos (inicio, fin) de tamaño parecido,
+    cada uno terminado en un salto de línea (salvo el último). Una línea más larga que
+    un rango queda entera en un solo rango.
+    """
+    rangos = []
+    tamano = max((fin - inicio) // max(partes, 1), 1)
+    desde = inicio
+    while desde < fin:
+        corte = datos.find(b'\n', min(desde + tamano, fin) - 1, fin)
+        hasta = corte + 1 if corte >= 0 else fin
+        rangos.append((desde, hasta))
+        desde = hasta
+    return rangos
+
+
+# Codificaciones en las que el salto de línea y los espacios ASCII son siempre un byte
+# que no aparece dentro de otros caracteres: se puede cortar y separar sin decodificar
+_CODIFICACIONES = ('utf-8', 'ascii', 'iso8859-1', 'iso8859-15', 'cp1252')
+
+
+def _decodificar_conteo(conteo: Counter, encoding: str, minusculas: bool) -> Counter:
+    """
+    Pasa un Counter de palabras en bytes a texto. bytes.split() solo corta en espacios
+    ASCII; str.split() también en otros (U+00A0, U+2003...), así que cada palabra se
+    vuelve a separar. Como eso se hace una vez por palabra distinta y no por aparición,
+    el resultado es el de str.split() sobre el texto sin decodificarlo entero.
+    """
+    resultado = Counter()
+    for clave, veces in conteo.items():
+        texto = clave.decode(encoding)
+        if minusculas:
+            texto = texto.lower()
+        for palabra in texto.split():
+            resultado[palabra] += veces
+    return resultado
+
+
+def _contar_rango(ruta: str, inicio: int, fin: int, minusculas: bool, patron: str, encoding: str) -> tuple:
+    """
+    Se ejecuta en cada proceso: (Counter, líneas) del rango de bytes inicio..fin.
+    """
+    expresion = re.compile(patron) if patron else None
+    en_bytes = expresion is None
+    conteo = Counter()
+    lineas = 0
+    with open(ruta, 'rb') as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        # Por bloques, para no copiar el rango entero de una vez
+        for desde, hasta in rangos_alineados(datos, inicio, fin, -(-(fin - inicio) // TAMANO_BLOQUE)):
+            bloque = datos[desde:hasta]
+            lineas += bloque.count(b'\n')
+            if en_bytes:
+                conteo.update(bloque.split())
+            else:
+                texto = bloque.decode(encoding)
+                if minusculas:
+                    texto = texto.lower()
+                conteo.update(expresion.findall(texto))
+    if not bloque.endswith(b'\n'):
+        lineas += 1  # Última línea del archivo, sin salto de línea
+    return (_decodificar_conteo(conteo, encoding, minusculas) if en_bytes else conteo), lineas
+
+
+def contar_palabras(ruta: str, procesos: int = None, minusculas: bool = False, patron: str = None,
+                    encoding: str = 'utf-8') -> dict:
+    """
+    Cuenta las palabras de un archivo de texto repartiéndolo entre varios procesos.
+    Args:
+        ruta: Archivo de texto
+        procesos: Cantidad de procesos (por defecto, uno por CPU); 1 cuenta en este proceso
+        minusculas: Contar 'Python' y 'python' como la misma palabra
+        patron: Expresión regular de una palabra (por defecto se separa con str.split())
+        encoding: Codificación del archivo (UTF-8, Latin-1 u otra compatible con ASCII)
+    Returns:
+        {'conteo': Counter, 'lineas': int, 'palabras': int, 'distintas': int, 'bytes': int}
+    """
+    if codecs.lookup(encoding).name not in _CODIFICACIONES:
+        raise ValueError(f"Codificación no soportada: {encoding} (el archivo se corta en bytes b'\\n')")
+    procesos = procesos or os.cpu_count() or 1
+    tamano = os.path.getsize(ruta)
+    conteo = Counter()
+    lineas = 0
+    if tamano:
+        with open(ruta, 'rb') as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            rangos = rangos_alineados(datos, 0, tamano, procesos)
+        argumentos = [(ruta, inicio, fin, minusculas, patron, encoding) for inicio, fin in rangos]
+        if procesos == 1 or len(rangos) == 1:
+            parciales = [_contar_rango(*args) for args in argumentos]
+        else:
+            with ProcessPoolExecutor(max_workers=min(procesos, len(rangos))) as executor:
+                parciales = list(executor.map(_contar_rango, *zip(*argumentos)))
+        for parcial, lineas_rango in parciales:
+            conteo.update(parcial)
+            lineas += lineas_rango
+    return {'conteo': conteo, 'lineas': lineas, 'palabras': sum(conteo.values()),
+            'distintas': len(conteo), 'bytes': tamano}
+
+
+def imprimir_resumen(resultado: dict, top: int = 10) -> None:
+    print(f"Líneas: {resultado['lineas']:,} - Palabras: {resultado['palabras']:,} - "
+          f"Distintas: {resultado['distintas']:,}")
+    if top:
+        print(f"Las {top} más frecuentes:")
+        for palabra, veces in resultado['conteo'].most_common(top):
+            print(f"  {palabra}: {veces:,}")
+
+
+# -----------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------
+
+def generar_texto(ruta: str, gigabytes: float) -> None:
+    """
+    Escribe un texto sintético de unos gigabytes GB con un vocabulario de 50.000 palabras.
+    """
+    import random
+    azar = random.Random(0)
+    vocabulario = [''.join(azar.choices('abcdefghijklmnopqrstuvwxyzáéíóúñ', k=azar.randint(2, 10)))
+                   for _ in range(50_000)]
+    bloque = '\n'.join(' '.join(azar.choices(vocabulario, k=azar.randint(3, 15)))
+                       for _ in range(200_000)).encode('utf-8') + b'\n'
+    with open(ruta, 'wb') as archivo:
+        for _ in range(max(1, int(gigabytes * 1e9 / len(bloque)))):
+            archivo.write(bloque)
+
+
+def _linea_por_linea(ruta: str) -> Counter:
+    """
+    El bucle del ejemplo 8 de archivos.py, acumulando en un Counter en vez de imprimir.
+    """
+    conteo = Counter()
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        for linea in archivo:
+            conteo.update(linea.split())
+    return conteo
+
+
+def benchmark(gigabytes: float = 1.0, procesos_maximos: int = None) -> None:
+    """
+    Compara el bucle línea por línea con contar_palabras usando 1, 2, 4... procesos
+    hasta procesos_maximos (por defecto, la cantidad de CPUs).
+    """
+    import tempfile
+
+    cpus = os.cpu_count() or 1
+    procesos_maximos = procesos_maximos or cpus
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'texto.txt')
+        generar_texto(ruta, gigabytes)
+        megabytes = os.path.getsize(ruta) / 1e6
+        print(f"Archivo de {megabytes:,.0f} MB, {cpus} CPU(s)")
+
+        inicio = time.perf_counter()
+        esperado = _linea_por_linea(ruta)
+        base = time.perf_counter() - inicio
+        print(f"  línea por línea:        {base:6.1f}s ({megabytes / base:5.0f} MB/s)")
+
+        procesos = 1
+        while True:
+            inicio = time.perf_counter()
+            resultado = contar_palabras(ruta, procesos)
+            segundos = time.perf_counter() - inicio
+            print(f"  contar_palabras({procesos:>2} p.): {segundos:6.1f}s ({megabytes / segundos:5.0f} MB/s, "
+                  f"{base / segundos:.1f}x) {'ok' if resultado['conteo'] == esperado else 'CONTEO DISTINTO'}")
+            if procesos >= procesos_maximos:
+                break
+            procesos = min(procesos * 2, procesos_maximos)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Conteo de palabras en paralelo")
+    parser.add_argument('ruta', nargs='?', help="Archivo de texto")
+    parser.add_argument('--procesos', type=int, help="Procesos (por defecto, uno por CPU)")
+    parser.add_argument('--minusculas', action='store_true', help="No distinguir mayúsculas")
+    parser.add_argument('--patron', help=r"Expresión regular de una palabra, ej.: '\w+'")
+    parser.add_argument('--top', type=int, default=10, help="Palabras más frecuentes a mostrar")
+    parser.add_argument('--benchmark', type=float, metavar='GB', help="Compara con el bucle línea por línea")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.procesos)
+    elif args.ruta:
+        inicio = time.perf_counter()
+        imprimir_resumen(contar_palabras(args.ruta, args.procesos, args.minusculas, args.patron), args.top)
+        print(f"({time.perf_counter() - inicio:.2f}s)")
+    else:
+        parser.print_help()
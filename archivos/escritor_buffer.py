@@ -0,0 +1,274 @@
+# -----------------------------------------------------
+# ESCRITOR CON BUFFER PARA ARCHIVOS QUE SE AGREGAN ("a")
+# -----------------------------------------------------
+# En el ejemplo 2 de archivos.py cada bloque abre el archivo, escribe y lo cierra.
+# Hacer eso por cada línea de un log (abrir en "a", write, cerrar) cuesta varias
+# llamadas al sistema por línea. EscritorBuffer abre el archivo una sola vez en modo
+# append, junta las líneas en memoria y las escribe de a muchas con os.writev (una
+# sola llamada al sistema para hasta IOV_MAX líneas, sin concatenarlas antes).
+#
+# Se vacía cuando:
+# - el buffer llega a tamano_buffer bytes,
+# - pasaron intervalo segundos desde el último vaciado (se verifica al escribir; con
+#   hilo=True un hilo en segundo plano vacía también cuando no se escribe nada),
+# - se llama a vaciar() o cerrar() (o al salir del bloque with).
+#
+# Con O_APPEND cada writev se agrega al final del archivo aunque otros procesos
+# también estén escribiendo en él.
+#
+# Uso:
+#   with EscritorBuffer("app.log", intervalo=1.0, hilo=True) as log:
+#       log.escribir("mensaje\n")
+#   python escritor_buffer.py --benchmark 1000000
+
+import os
+import threading
+import time
+
+
+def _iov_max() -> int:
+    # sysconf no existe en Windows, falla si el sistema no conoce el nombre y
+    # devuelve -1 si no hay límite definido; en esos casos se usa el de Linux
+    try:
+        valor = os.sysconf('SC_IOV_MAX')
+    except (AttributeError, ValueError, OSError):
+        return 1024
+    return valor if valor > 0 else 1024
+
+
+IOV_MAX = _iov_max()  # Buffers por llamada a writev
+_reloj = time.monotonic
+
+
+def _escribir_todo(descriptor: int, partes: list) -> None:
+    """
+    Escribe partes (lista de bytes) completas: writev de a IOV_MAX buffers, retomando
+    si el sistema escribe menos de lo pedido. Si una escritura falla, partes queda
+    solo con lo que no se llegó a escribir.
+    """
+    escritos = 0  # Bytes de partes ya escritos
+    try:
+        for inicio in range(0, len(partes), IOV_MAX):
+            grupo = partes[inicio:inicio + IOV_MAX]
+            cantidad = os.writev(descriptor, grupo) if hasattr(os, 'writev') else 0
+            escritos += cantidad
+            resto = sum(map(len, grupo)) - cantidad
+            if resto:
+                # Escritura parcial (o un sistema sin writev, como Windows): lo que falta en un solo buffer
+                datos = memoryview(b''.join(grupo))[-resto:]
+                while datos:
+                    cantidad = os.write(descriptor, datos)
+                    escritos += cantidad
+                    datos = datos[cantidad:]
+    except OSError:
+        completas = 0
+        while completas < len(partes) and escritos >= len(partes[completas]):
+            escritos -= len(partes[completas])
+            completas += 1
+        if escritos:
+            partes[completas] = partes[completas][escritos:]
+        del partes[:completas]
+        raise
+
+
+class EscritorBuffer:
+    """Escritura de texto al final de un archivo, vaciada por tamaño o por tiempo."""
+    def __init__(self, ruta: str, tamano_buffer: int = 1024 * 1024, intervalo: float = 1.0,
+                 hilo: bool = False, encoding: str = 'utf-8'):
+        """
+        Args:
+            ruta: Archivo (se crea si no existe; lo existente no se toca)
+            tamano_buffer: Bytes acumulados que provocan un vaciado
+            intervalo: Segundos máximos entre vaciados (None: solo por tamaño)
+            hilo: Vaciar cada intervalo desde un hilo en segundo plano, aunque no se escriba
+            encoding: Codificación del texto
+        """
+        if hilo and not intervalo:
+            raise ValueError("hilo=True necesita un intervalo")
+        self.ruta = ruta
+        self.tamano_buffer = tamano_buffer
+        self.intervalo = intervalo
+        self.encoding = encoding
+        self.estadisticas = {'vaciados': 0, 'escrituras': 0, 'bytes': 0}
+        self._descriptor = os.open(ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        self._partes = []
+        self._pendientes = 0  # Bytes en _partes
+        self._proximo_vaciado = time.monotonic() + intervalo if intervalo else float('inf')
+        self._lock = threading.Lock()
+        self._error = None  # Error del hilo, se relanza en la próxima operación
+        self._detener = threading.Event()
+        self._hilo = None
+        if hilo:
+            self._hilo = threading.Thread(target=self._vaciar_periodicamente, name=f"EscritorBuffer({ruta})", daemon=True)
+            self._hilo.start()
+
+    @property
+    def cerrado(self) -> bool:
+        return self._descriptor is None
+
+    def escribir(self, texto: str) -> None:
+        """
+        Agrega texto al buffer (como write(), no agrega el salto de línea).
+        """
+        datos = texto.encode(self.encoding)
+        with self._lock:
+            if self._error is not None or self._descriptor is None:
+                self._verificar()
+            self._partes.append(datos)
+            self._pendientes += len(datos)
+            if self._pendientes >= self.tamano_buffer or _reloj() >= self._proximo_vaciado:
+                self._vaciar()
+
+    def escribir_lineas(self, lineas) -> None:
+        """
+        Agrega varios textos de una vez (como writelines(), sin agregar saltos de línea).
+        """
+        datos = [linea.encode(self.encoding) for linea in lineas]
+        with self._lock:
+            self._verificar()
+            self._partes.extend(datos)
+            self._pendientes += sum(map(len, datos))
+            if self._pendientes >= self.tamano_buffer or _reloj() >= self._proximo_vaciado:
+                self._vaciar()
+
+    def vaciar(self, sincronizar: bool = False) -> None:
+        """
+        Escribe lo que haya en el buffer. Con sincronizar=True además espera a que el
+        sistema lo guarde en disco (os.fsync).
+        """
+        with self._lock:
+            self._verificar()
+            self._vaciar()
+            if sincronizar:
+                os.fsync(self._descriptor)
+
+    def _verificar(self) -> None:
+        if self._descriptor is None:
+            raise ValueError(f"El escritor de {self.ruta} está cerrado")
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _vaciar(self) -> None:
+        # Se llama con el lock tomado
+        if self.intervalo:
+            self._proximo_vaciado = time.monotonic() + self.intervalo
+        if not self._partes:
+            return
+        partes, pendientes = self._partes, self._pendientes
+        try:
+            _escribir_todo(self._descriptor, partes)
+        except OSError:
+            # Lo que no se escribió queda en el buffer para el próximo vaciado
+            self._pendientes = sum(map(len, partes))
+            raise
+        self._partes, self._pendientes = [], 0
+        self.estadisticas['vaciados'] += 1
+        self.estadisticas['escrituras'] += len(partes)
+        self.estadisticas['bytes'] += pendientes
+
+    def _vaciar_periodicamente(self) -> None:
+        espera = self.intervalo
+        while not self._detener.wait(espera):
+            with self._lock:
+                if self._descriptor is None:
+                    return
+                # Si se vació al escribir, esperar hasta el próximo vencimiento
+                espera = self._proximo_vaciado - time.monotonic()
+                if espera > 0:
+                    continue
+                try:
+                    self._vaciar()
+                except OSError as error:
+                    self._error = error
+                espera = self.intervalo
+
+    def cerrar(self) -> None:
+        """
+        Detiene el hilo, escribe lo pendiente y cierra el archivo.
+        """
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join()
+            self._hilo = None
+        with self._lock:
+            if self._descriptor is None:
+                return
+            try:
+                # Un error anterior del hilo no perdió datos: el buffer se reintenta ahora
+                self._error = None
+                self._vaciar()
+            finally:
+                os.close(self._descriptor)
+                self._descriptor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+# -----------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------
+
+def _linea(numero: int) -> str:
+    return f"2026-10-18 12:{numero // 60 % 60:02d}:{numero % 60:02d} INFO servicio=api latencia_ms={numero % 997} usuario={numero}\n"
+
+
+def benchmark(lineas: int = 1_000_000) -> None:
+    """
+    Líneas por segundo al agregar lineas líneas a un log: abriendo el archivo en "a"
+    por cada línea (como el ejemplo 2 de archivos.py), con un solo open() y write()
+    por línea, y con EscritorBuffer (con y sin hilo).
+    """
+    import tempfile
+
+    textos = [_linea(numero) for numero in range(lineas)]
+    esperado = ''.join(textos).encode('utf-8')
+
+    def por_linea(ruta):
+        for texto in textos:
+            with open(ruta, 'a', encoding='utf-8') as archivo:
+                archivo.write(texto)
+
+    def un_open(ruta):
+        with open(ruta, 'a', encoding='utf-8') as archivo:
+            for texto in textos:
+                archivo.write(texto)
+
+    def buffer(ruta, hilo=False):
+        with EscritorBuffer(ruta, hilo=hilo) as escritor:
+            for texto in textos:
+                escritor.escribir(texto)
+
+    variantes = [("open('a') por línea", por_linea), ("un open() + write()", un_open),
+                 ("EscritorBuffer", buffer), ("EscritorBuffer con hilo", lambda ruta: buffer(ruta, hilo=True))]
+    with tempfile.TemporaryDirectory() as directorio:
+        print(f"{lineas:,} líneas ({len(esperado) / 1e6:.0f} MB)")
+        base = None
+        for numero, (nombre, escribir) in enumerate(variantes):
+            ruta = os.path.join(directorio, f"{numero}.log")
+            inicio = time.perf_counter()
+            escribir(ruta)
+            segundos = time.perf_counter() - inicio
+            base = base or segundos
+            with open(ruta, 'rb') as archivo:
+                correcto = archivo.read() == esperado
+            print(f"  {nombre:<25} {lineas / segundos:>12,.0f} líneas/s ({base / segundos:6.1f}x) "
+                  f"{'ok' if correcto else 'CONTENIDO DISTINTO'}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Escritura de logs con buffer")
+    parser.add_argument('--benchmark', type=int, metavar='LINEAS',
+                        help="Compara con abrir el archivo por cada línea, escribiendo LINEAS líneas")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        parser.print_help()
@@ -0,0 +1,256 @@
+# -----------------------------------------------------
+# LECTOR DE ARCHIVOS CON ÍNDICE DE LÍNEAS
+# -----------------------------------------------------
+# read(), readlines() y el bucle línea por línea de archivos.py recorren el archivo
+# desde el principio: para llegar a la línea N hay que leer todas las anteriores.
+# LectorIndexado abre el archivo con mmap y guarda, en un archivo aparte
+# (<archivo>.idx), dónde empieza cada línea. Con ese índice cualquier línea o rango
+# de líneas está a un acceso de distancia, y vista() lo devuelve como memoryview
+# sobre el mmap, sin copiar los bytes.
+#
+# El índice se construye una vez (recorriendo el archivo por bloques) y se vuelve a
+# usar mientras el archivo no cambie de tamaño ni de fecha de modificación; al
+# reabrirlo también se usa con mmap, así que no se lee entero.
+#
+# Uso:
+#   python lector_indexado.py app.log 1000000        # imprime la línea 1.000.000
+#   python lector_indexado.py --benchmark 10         # archivo de log de 10 GB
+
+import array
+import contextlib
+import itertools
+import mmap
+import operator
+import os
+import struct
+import time
+
+# Encabezado del archivo de índice: firma, tamaño y fecha de modificación del archivo indexado
+_FIRMA = b'LIDX0001'
+_ENCABEZADO = struct.Struct('<8sQQ')
+TAMANO_BLOQUE = 64 * 1024 * 1024  # Bytes por bloque al construir el índice
+
+
+def construir_indice(datos, tamano_bloque: int = TAMANO_BLOQUE) -> array.array:
+    """
+    Devuelve un array('Q') con el offset de inicio de cada línea, más uno final con
+    el tamaño total (así la línea n va de indice[n] a indice[n + 1]).
+    Args:
+        datos: Bytes o mmap del archivo
+        tamano_bloque: Bytes que se procesan por vez; cada bloque termina en un salto de línea
+    """
+    indice = array.array('Q')
+    total = len(datos)
+    inicio = 0
+    while inicio < total:
+        fin = min(inicio + tamano_bloque, total)
+        if fin < total:
+            # Cortar después del último salto de línea del bloque; si no hay ninguno (una
+            # línea más larga que el bloque), después del primero que aparezca
+            corte = datos.rfind(b'\n', inicio, fin)
+            if corte < 0:
+                corte = datos.find(b'\n', fin)
+            fin = corte + 1 if corte >= 0 else total
+        lineas = datos[inicio:fin].split(b'\n')
+        if lineas[-1] == b'':
+            lineas.pop()  # El bloque termina en salto de línea
+        # Offsets acumulando len(linea) + 1 sin un bucle de Python
+        largos = map(operator.add, map(len, lineas), itertools.repeat(1))
+        indice.extend(itertools.accumulate(largos, initial=inicio))
+        indice.pop()  # El último es el inicio del bloque siguiente
+        inicio = fin
+    indice.append(total)
+    return indice
+
+
+class LectorIndexado:
+    """Acceso directo a las líneas de un archivo de texto a través de mmap y un índice persistente."""
+    def __init__(self, ruta: str, ruta_indice: str = None):
+        """
+        Args:
+            ruta: Archivo de texto
+            ruta_indice: Dónde guardar el índice (por defecto, ruta + '.idx')
+        """
+        self.ruta = ruta
+        self.ruta_indice = ruta_indice or f"{ruta}.idx"
+        self._archivo = open(ruta, 'rb')
+        estado = os.fstat(self._archivo.fileno())
+        self._firma = (estado.st_size, estado.st_mtime_ns)
+        # mmap no admite archivos vacíos
+        self._datos = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ) if estado.st_size else b''
+        self._mapa_indice = None
+        self.indice = self._cargar_indice()
+
+    def _cargar_indice(self):
+        """
+        Índice guardado, como memoryview('Q') sobre el .idx abierto con mmap, o un
+        array('Q') construido de nuevo si no hay índice o es de otra versión del archivo.
+        """
+        try:
+            with open(self.ruta_indice, 'rb') as archivo:
+                mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # Sin índice, o vacío
+            mapa = None
+        if mapa is not None:
+            largo = len(mapa) - _ENCABEZADO.size
+            if largo >= 0 and largo % 8 == 0 and _ENCABEZADO.unpack_from(mapa) == (_FIRMA, *self._firma):
+                self._mapa_indice = mapa
+                return memoryview(mapa)[_ENCABEZADO.size:].cast('Q')
+            mapa.close()  # Ilegible o desactualizado: se construye de nuevo
+        indice = construir_indice(self._datos)
+        temporal = f"{self.ruta_indice}.tmp"
+        try:
+            with open(temporal, 'wb') as archivo:
+                archivo.write(_ENCABEZADO.pack(_FIRMA, *self._firma))
+                indice.tofile(archivo)
+            os.replace(temporal, self.ruta_indice)
+        except OSError:
+            # Por ejemplo, una carpeta de solo lectura: el índice se usa desde memoria
+            with contextlib.suppress(OSError):
+                os.remove(temporal)
+        return indice
+
+    def __len__(self) -> int:
+        return max(len(self.indice) - 1, 0)
+
+    def _posiciones(self, inicio: int, fin: int):
+        if not 0 <= inicio <= fin <= len(self):
+            raise IndexError(f"Rango de líneas fuera del archivo: {inicio}-{fin} (hay {len(self)})")
+        return self.indice[inicio], self.indice[fin]
+
+    def vista(self, inicio: int, fin: int = None) -> memoryview:
+        """
+        Bytes de las líneas inicio..fin-1 (solo la línea inicio si no hay fin), con sus
+        saltos de línea, como memoryview del mmap: no se copian. Hay que liberarla
+        (release() o salir de un bloque with) antes de cerrar el lector.
+        """
+        desde, hasta = self._posiciones(inicio, inicio + 1 if fin is None else fin)
+        return memoryview(self._datos)[desde:hasta]
+
+    def linea(self, numero: int, encoding: str = 'utf-8') -> str:
+        """
+        Texto de la línea numero (desde 0), sin el salto de línea.
+        """
+        desde, hasta = self._posiciones(numero, numero + 1)
+        return self._datos[desde:hasta].rstrip(b'\r\n').decode(encoding)
+
+    def lineas(self, inicio: int, fin: int, encoding: str = 'utf-8') -> list:
+        """
+        Textos de las líneas inicio..fin-1, sin los saltos de línea.
+        """
+        desde, hasta = self._posiciones(inicio, fin)
+        # split('\n') y no splitlines(), que también corta en otros caracteres que el índice no cuenta
+        texto = self._datos[desde:hasta].decode(encoding)
+        lineas = texto.split('\n')
+        if texto.endswith('\n') or not texto:
+            lineas.pop()  # Lo que sigue al último salto de línea
+        return [linea.rstrip('\r') for linea in lineas]
+
+    def cerrar(self) -> None:
+        if self._mapa_indice is not None:
+            self.indice.release()
+            self._mapa_indice.close()
+        if isinstance(self._datos, mmap.mmap):
+            self._datos.close()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+# -----------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------
+
+def generar_log(ruta: str, gigabytes: float) -> int:
+    """
+    Escribe un log sintético de unos gigabytes GB y devuelve la cantidad de líneas.
+    """
+    bloque = b''.join(b'2026-10-18 12:%02d:%02d INFO servicio=api latencia_ms=%d usuario=%d mensaje=solicitud procesada\n'
+                      % (i // 60 % 60, i % 60, i % 997, i) for i in range(100_000))
+    lineas = 0
+    with open(ruta, 'wb') as archivo:
+        for _ in range(max(1, int(gigabytes * 1e9 / len(bloque)))):
+            archivo.write(bloque)
+            lineas += 100_000
+    return lineas
+
+
+def _con_readlines(ruta: str, numeros: list) -> tuple:
+    """
+    Se ejecuta en un proceso aparte: (segundos, líneas pedidas) leyendo con readlines().
+    """
+    inicio = time.perf_counter()
+    with open(ruta, 'r') as archivo:
+        lineas = archivo.readlines()
+    return time.perf_counter() - inicio, [lineas[numero].rstrip('\n') for numero in numeros]
+
+
+def benchmark(gigabytes: float = 10.0, consultas: int = 10_000) -> None:
+    """
+    Compara llegar a líneas al azar de un log de gigabytes GB con readlines() y con
+    LectorIndexado (construyendo el índice y reutilizándolo). readlines() corre en un
+    proceso aparte porque con archivos más grandes que la memoria el sistema lo mata.
+    """
+    import multiprocessing
+    import random
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'app.log')
+        inicio = time.perf_counter()
+        total = generar_log(ruta, gigabytes)
+        print(f"Log de {os.path.getsize(ruta) / 1e9:.1f} GB y {total:,} líneas generado en {time.perf_counter() - inicio:.1f}s")
+        azar = random.Random(0)
+        numeros = [azar.randrange(total) for _ in range(consultas)]
+
+        inicio = time.perf_counter()
+        with LectorIndexado(ruta) as lector:
+            construccion = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        with LectorIndexado(ruta) as lector:
+            apertura = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            esperadas = [lector.linea(numero) for numero in numeros]
+            acceso = (time.perf_counter() - inicio) / consultas
+            inicio = time.perf_counter()
+            with lector.vista(total // 2, total // 2 + 1000) as vista:
+                rango = time.perf_counter() - inicio
+                largo_rango = len(vista)
+        print(f"LectorIndexado: índice construido en {construccion:.1f}s ({os.path.getsize(ruta) / 1e6 / construccion:.0f} MB/s, "
+              f"{os.path.getsize(ruta + '.idx') / 1e6:.0f} MB), reabierto en {apertura * 1000:.0f} ms")
+        print(f"  {consultas} líneas al azar: {acceso * 1e6:.1f} µs por línea; vista de 1000 líneas "
+              f"({largo_rango / 1e3:.0f} KB) en {rango * 1e6:.1f} µs")
+
+        contexto = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                segundos, lineas = executor.submit(_con_readlines, ruta, numeros).result()
+            print(f"readlines(): {segundos:.1f}s para llegar a cualquier línea "
+                  f"({'mismas líneas' if lineas == esperadas else 'LÍNEAS DISTINTAS'})")
+        except (BrokenProcessPool, MemoryError):
+            print("readlines(): el proceso se quedó sin memoria (el archivo no entra en RAM)")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Acceso directo a líneas de archivos grandes")
+    parser.add_argument('ruta', nargs='?', help="Archivo de texto")
+    parser.add_argument('numero', nargs='?', type=int, default=0, help="Línea a imprimir (desde 0)")
+    parser.add_argument('--benchmark', type=float, metavar='GB', help="Compara con readlines() en un log de GB gigabytes")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.ruta:
+        with LectorIndexado(args.ruta) as lector:
+            print(f"{len(lector)} líneas; línea {args.numero}:")
+            print(lector.linea(args.numero))
+    else:
+        parser.print_help()
@@ -0,0 +1,370 @@
+# -----------------------------------------------------
+# ARCHIVOS DE REGISTROS BINARIOS DE ANCHO FIJO
+# -----------------------------------------------------
+# El ejemplo 6 de archivos.py escribe y lee un solo bloque de bytes. Para guardar
+# millones de lecturas de sensores, cada registro se empaqueta con struct en un
+# tamaño fijo (24 bytes con los campos de CAMPOS_SENSOR), así que el registro n
+# está en una posición conocida y no hay nada que interpretar al leerlo:
+#
+#   [encabezado de 4096 bytes][registro 0][registro 1]...
+#
+# El encabezado guarda una firma, el tamaño de registro y la descripción de los
+# campos (nombre:código struct), de modo que el archivo se puede leer sin saber de
+# antemano su formato. Los registros empiezan en un límite de página y se escriben y
+# leen en bloques de registros_por_bloque registros (por defecto 1,5 MiB, múltiplo de
+# 4096 bytes).
+#
+# Formas de leer:
+# - LectorRegistros.bloques(): tuplas de Python, con struct.iter_unpack por bloque.
+# - LectorRegistros.vista(): el archivo entero como arreglo estructurado de NumPy
+#   sobre mmap (numpy.memmap); no se lee ni se convierte nada hasta que se usa.
+#
+# Uso:
+#   with EscritorRegistros("sensores.bin") as escritor:
+#       escritor.escribir((marca_tiempo, sensor, temperatura, humedad, presion))
+#   with LectorRegistros("sensores.bin") as lector:
+#       print(lector.vista()['temperatura'].mean())
+#   python registros_binarios.py --benchmark 100000000
+
+import os
+import struct
+import time
+
+# Lectura de un sensor: (nombre, código de struct). Los códigos de tamaño 8 van
+# primero para que cada campo quede alineado a su tamaño sin relleno
+CAMPOS_SENSOR = (
+    ('marca_tiempo', 'q'),  # Nanosegundos desde 1970
+    ('sensor', 'I'),
+    ('temperatura', 'f'),
+    ('humedad', 'f'),
+    ('presion', 'f'),
+)
+
+_FIRMA = b'REGB0001'
+_ENCABEZADO = struct.Struct('<8sII')  # Firma, tamaño de registro, largo de la descripción de campos
+TAMANO_ENCABEZADO = 4096  # Los registros empiezan alineados a página
+REGISTROS_POR_BLOQUE = 65_536
+
+
+def _describir(campos) -> bytes:
+    return ','.join(f"{nombre}:{codigo}" for nombre, codigo in campos).encode('ascii')
+
+
+def _leer_campos(descripcion: bytes) -> tuple:
+    return tuple(tuple(campo.split(':')) for campo in descripcion.decode('ascii').split(','))
+
+
+def formato(campos) -> struct.Struct:
+    """
+    struct.Struct de un registro: little endian y sin relleno entre campos.
+    """
+    return struct.Struct('<' + ''.join(codigo for _, codigo in campos))
+
+
+def tipo_numpy(campos):
+    """
+    dtype estructurado de NumPy con la misma disposición en bytes que formato(campos).
+    Los códigos de struct y de NumPy coinciden salvo para cadenas ('10s' es 'S10').
+    """
+    import numpy as np
+    dtype = np.dtype([(nombre, f"S{codigo[:-1] or 1}" if codigo.endswith('s') else '<' + codigo)
+                      for nombre, codigo in campos])
+    if dtype.itemsize != formato(campos).size:
+        raise ValueError(f"Los campos {campos} no tienen el mismo tamaño en struct y en NumPy")
+    return dtype
+
+
+class EscritorRegistros:
+    """Escribe registros de ancho fijo en bloques grandes."""
+    def __init__(self, ruta: str, campos=CAMPOS_SENSOR, registros_por_bloque: int = REGISTROS_POR_BLOQUE,
+                 agregar: bool = False):
+        """
+        Args:
+            ruta: Archivo de registros
+            campos: Tupla de (nombre, código struct) de cada campo
+            registros_por_bloque: Registros que se juntan antes de cada escritura
+            agregar: Agregar al final de un archivo existente (con los mismos campos)
+                en vez de reemplazarlo
+        """
+        self.ruta = ruta
+        self.campos = tuple(campos)
+        self.formato = formato(self.campos)
+        self.registros = 0  # Registros escritos por este escritor
+        descripcion = _describir(self.campos)
+        if _ENCABEZADO.size + len(descripcion) > TAMANO_ENCABEZADO:
+            raise ValueError("Demasiados campos para el encabezado")
+        if agregar and os.path.exists(ruta):
+            with LectorRegistros(ruta) as lector:
+                if lector.campos != self.campos:
+                    raise ValueError(f"{ruta} tiene otros campos: {lector.campos}")
+                existentes = len(lector)
+            self._archivo = open(ruta, 'r+b')
+            self._archivo.seek(TAMANO_ENCABEZADO + existentes * self.formato.size)
+            self._archivo.truncate()  # Descarta un registro incompleto al final, si lo hay
+        else:
+            self._archivo = open(ruta, 'wb')
+            encabezado = _ENCABEZADO.pack(_FIRMA, self.formato.size, len(descripcion)) + descripcion
+            self._archivo.write(encabezado.ljust(TAMANO_ENCABEZADO, b'\0'))
+        self._bloque = bytearray(registros_por_bloque * self.formato.size)
+        self._posicion = 0  # Bytes ocupados de _bloque
+
+    def escribir(self, registro: tuple) -> None:
+        """
+        Agrega un registro (tupla con un valor por campo).
+        """
+        self.formato.pack_into(self._bloque, self._posicion, *registro)
+        self._posicion += self.formato.size
+        self.registros += 1
+        if self._posicion == len(self._bloque):
+            self._vaciar()
+
+    def escribir_registros(self, registros) -> None:
+        """
+        Agrega muchos registros (un iterable de tuplas).
+        """
+        empaquetar = self.formato.pack_into
+        tamano = self.formato.size
+        bloque = self._bloque
+        inicio = posicion = self._posicion
+        try:
+            for registro in registros:
+                empaquetar(bloque, posicion, *registro)
+                posicion += tamano
+                if posicion == len(bloque):
+                    self._posicion = posicion
+                    self._vaciar()
+                    self.registros += (posicion - inicio) // tamano
+                    inicio = posicion = 0
+        finally:
+            self._posicion = posicion
+            self.registros += (posicion - inicio) // tamano
+
+    def escribir_arreglo(self, arreglo) -> None:
+        """
+        Agrega los registros de un arreglo de NumPy con dtype tipo_numpy(campos) (o de
+        un array.array / bytes con registros ya empaquetados), sin empaquetarlos de a uno.
+        """
+        if hasattr(arreglo, 'dtype') and arreglo.dtype != tipo_numpy(self.campos):
+            # Con otro dtype los bytes se escribirían igual, pero con otra disposición
+            raise ValueError(f"El arreglo tiene dtype {arreglo.dtype}, se esperaba {tipo_numpy(self.campos)}")
+        datos = memoryview(arreglo).cast('B')
+        if len(datos) % self.formato.size:
+            raise ValueError(f"El tamaño ({len(datos)} bytes) no es múltiplo del registro ({self.formato.size})")
+        self._vaciar()
+        self._archivo.write(datos)
+        self.registros += len(datos) // self.formato.size
+
+    def _vaciar(self) -> None:
+        if self._posicion:
+            self._archivo.write(memoryview(self._bloque)[:self._posicion])
+            self._posicion = 0
+
+    def cerrar(self) -> None:
+        if not self._archivo.closed:
+            self._vaciar()
+            self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+class LectorRegistros:
+    """Lee un archivo de EscritorRegistros por bloques, por posición o como arreglo de NumPy."""
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._archivo = open(ruta, 'rb')
+        encabezado = self._archivo.read(TAMANO_ENCABEZADO)
+        try:
+            firma, tamano, largo = _ENCABEZADO.unpack_from(encabezado)
+        except struct.error:
+            firma = None
+        if firma != _FIRMA:
+            self._archivo.close()
+            raise ValueError(f"{ruta} no es un archivo de registros")
+        self.campos = _leer_campos(encabezado[_ENCABEZADO.size:_ENCABEZADO.size + largo])
+        self.formato = formato(self.campos)
+        if self.formato.size != tamano:
+            self._archivo.close()
+            raise ValueError(f"{ruta}: el tamaño de registro no coincide con los campos")
+
+    def __len__(self) -> int:
+        # Un registro incompleto al final (escritura interrumpida) no se cuenta
+        return (os.fstat(self._archivo.fileno()).st_size - TAMANO_ENCABEZADO) // self.formato.size
+
+    def registro(self, numero: int) -> tuple:
+        """
+        Registro número numero (desde 0).
+        """
+        if not 0 <= numero < len(self):
+            raise IndexError(f"Registro fuera del archivo: {numero} (hay {len(self)})")
+        posicion = TAMANO_ENCABEZADO + numero * self.formato.size
+        if hasattr(os, 'pread'):
+            datos = os.pread(self._archivo.fileno(), self.formato.size, posicion)
+        else:  # Windows no tiene pread
+            self._archivo.seek(posicion)
+            datos = self._archivo.read(self.formato.size)
+        return self.formato.unpack(datos)
+
+    def bloques(self, registros_por_bloque: int = REGISTROS_POR_BLOQUE):
+        """
+        Genera listas de hasta registros_por_bloque tuplas, leyendo el archivo con
+        readinto() en un buffer que se reutiliza.
+        """
+        buffer = bytearray(registros_por_bloque * self.formato.size)
+        vista = memoryview(buffer)
+        desempaquetar = self.formato.iter_unpack
+        restantes = len(self) * self.formato.size
+        self._archivo.seek(TAMANO_ENCABEZADO)
+        while restantes:
+            leidos = self._archivo.readinto(vista[:min(restantes, len(buffer))])
+            if not leidos:
+                break
+            restantes -= leidos
+            yield list(desempaquetar(vista[:leidos - leidos % self.formato.size]))
+
+    def vista(self):
+        """
+        Todos los registros como numpy.memmap de solo lectura con dtype tipo_numpy(campos):
+        vista()['temperatura'] es una columna y vista()[n] un registro, leídos del
+        archivo recién cuando se usan.
+        """
+        import numpy as np
+        registros = len(self)
+        if not registros:
+            return np.empty(0, dtype=tipo_numpy(self.campos))
+        return np.memmap(self.ruta, dtype=tipo_numpy(self.campos), mode='r', offset=TAMANO_ENCABEZADO,
+                         shape=(registros,))
+
+    def cerrar(self) -> None:
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+# -----------------------------------------------------
+# BENCHMARK
+# -----------------------------------------------------
+
+def lecturas_sinteticas(registros: int, bloque: int = 1_000_000):
+    """
+    Genera arreglos estructurados (dtype tipo_numpy(CAMPOS_SENSOR)) con lecturas de
+    1.000 sensores, de a bloque registros.
+    """
+    import numpy as np
+    rng = np.random.default_rng(0)
+    dtype = tipo_numpy(CAMPOS_SENSOR)
+    for inicio in range(0, registros, bloque):
+        cantidad = min(bloque, registros - inicio)
+        arreglo = np.empty(cantidad, dtype=dtype)
+        arreglo['marca_tiempo'] = 1_790_000_000_000_000_000 + np.arange(inicio, inicio + cantidad) * 1_000_000
+        arreglo['sensor'] = rng.integers(0, 1000, cantidad)
+        # Redondeados como se escribirían en un CSV, para que ambos formatos guarden lo mismo
+        arreglo['temperatura'] = rng.normal(21, 4, cantidad).round(2)
+        arreglo['humedad'] = rng.uniform(20, 90, cantidad).round(1)
+        arreglo['presion'] = rng.normal(1013, 8, cantidad).round(1)
+        yield arreglo
+
+
+def _tuplas(registros: int):
+    for arreglo in lecturas_sinteticas(registros):
+        yield from arreglo.tolist()
+
+
+def benchmark(registros: int = 100_000_000) -> None:
+    """
+    Compara escribir registros registros y calcular la temperatura media en CSV
+    (módulo csv) y en el formato binario (por tuplas y como arreglo de NumPy).
+    """
+    import csv
+    import tempfile
+
+    def medir(nombre, funcion, ruta=None):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        tamano = f", {os.path.getsize(ruta) / 1e9:.2f} GB" if ruta else ''
+        print(f"  {nombre:<44} {segundos:8.1f}s {registros / segundos:>13,.0f} registros/s{tamano}")
+        return resultado
+
+    def escribir_csv(ruta):
+        with open(ruta, 'w', newline='') as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow([nombre for nombre, _ in CAMPOS_SENSOR])
+            for marca, sensor, temperatura, humedad, presion in _tuplas(registros):
+                escritor.writerow((marca, sensor, f"{temperatura:.2f}", f"{humedad:.1f}", f"{presion:.1f}"))
+
+    def media_csv(ruta):
+        with open(ruta, newline='') as archivo:
+            lector = csv.reader(archivo)
+            next(lector)
+            suma = cantidad = 0
+            for fila in lector:
+                # Cada campo se convierte aunque solo se use uno: así se lee un registro de CSV
+                marca, sensor, temperatura, humedad, presion = int(fila[0]), int(fila[1]), float(fila[2]), float(fila[3]), float(fila[4])
+                suma += temperatura
+                cantidad += 1
+        return suma / cantidad
+
+    def escribir_tuplas(ruta):
+        with EscritorRegistros(ruta) as escritor:
+            escritor.escribir_registros(_tuplas(registros))
+
+    def escribir_arreglos(ruta):
+        with EscritorRegistros(ruta) as escritor:
+            for arreglo in lecturas_sinteticas(registros):
+                escritor.escribir_arreglo(arreglo)
+
+    def media_tuplas(ruta):
+        suma = cantidad = 0
+        with LectorRegistros(ruta) as lector:
+            for bloque in lector.bloques():
+                suma += sum(registro[2] for registro in bloque)
+                cantidad += len(bloque)
+        return suma / cantidad
+
+    def media_vista(ruta):
+        with LectorRegistros(ruta) as lector:
+            return float(lector.vista()['temperatura'].mean(dtype='float64'))
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = os.path.join(directorio, 'sensores.csv')
+        ruta_bin = os.path.join(directorio, 'sensores.bin')
+        print(f"{registros:,} lecturas de sensores ({formato(CAMPOS_SENSOR).size} bytes por registro binario)")
+        print("Escritura:")
+        medir("CSV (csv.writer)", lambda: escribir_csv(ruta_csv), ruta_csv)
+        medir("binario, por tupla (escribir_registros)", lambda: escribir_tuplas(ruta_bin), ruta_bin)
+        medir("binario, por arreglo (escribir_arreglo)", lambda: escribir_arreglos(ruta_bin), ruta_bin)
+        print("Temperatura media:")
+        medias = [medir("CSV (csv.reader + int/float)", lambda: media_csv(ruta_csv)),
+                  medir("binario, tuplas por bloque (bloques)", lambda: media_tuplas(ruta_bin)),
+                  medir("binario, NumPy sobre mmap (vista)", lambda: media_vista(ruta_bin))]
+        iguales = max(medias) - min(medias) < 1e-4  # El binario guarda float32
+        print(f"  media: {medias[0]:.4f} ({'igual en los tres' if iguales else f'DISTINTA: {medias}'})")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Registros binarios de ancho fijo")
+    parser.add_argument('ruta', nargs='?', help="Archivo de registros a describir")
+    parser.add_argument('--benchmark', type=int, metavar='REGISTROS', help="Compara con CSV para REGISTROS registros")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.ruta:
+        with LectorRegistros(args.ruta) as lector:
+            print(f"{len(lector):,} registros de {lector.formato.size} bytes: "
+                  f"{', '.join(nombre for nombre, _ in lector.campos)}")
+            for numero in range(min(len(lector), 5)):
+                print(lector.registro(numero))
+    else:
+        parser.print_help()
@@ -0,0 +1,303 @@
+# -----------------------------------------------------
+# Almacén SQLite de usuarios
+# -----------------------------------------------------
+# Backend de carga del pipeline de usuarios (ex/etl-users.py) para SQLite. A
+# diferencia de la tabla que crea to_sql (sin clave primaria ni índices, así que
+# cada búsqueda recorre la tabla entera), la tabla tiene id como INTEGER PRIMARY KEY
+# (el rowid de SQLite, sin índice aparte) e índices por email, username y ciudad.
+#
+# La base se abre en modo WAL: los lectores siguen leyendo la versión anterior
+# mientras se carga la nueva y no bloquean al escritor. Cada carga es una sola
+# transacción: la tabla nueva se llena con executemany, se indexa recién al final
+# (construir un índice de una vez es más barato que mantenerlo fila a fila) y
+# reemplaza a la anterior en el mismo COMMIT.
+#
+# CargaIncremental es el modo CDC: en lugar de reescribir la tabla, compara la
+# huella (hash) de cada usuario extraído con la guardada en la carga anterior
+# (tabla <tabla>__huellas) y solo inserta, actualiza o borra las filas que
+# cambiaron. Cada cambio queda en el registro <tabla>__cambios con un número de
+# secuencia creciente, para que los consumidores se pongan al día leyendo desde la
+# última secuencia que procesaron (ver consultas_usuarios.py).
+
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import pandas as pd
+
+from destinos import Destino
+
+# Columnas de la tabla de usuarios, en el orden en que las produce el pipeline
+COLUMNAS_USUARIOS: List[Tuple[str, str]] = [
+    ('id', 'INTEGER PRIMARY KEY'),
+    ('name', 'TEXT'),
+    ('username', 'TEXT'),
+    ('email', 'TEXT'),
+    ('phone', 'TEXT'),
+    ('website', 'TEXT'),
+    ('company_name', 'TEXT'),
+    ('address_city', 'TEXT'),
+    ('address_street', 'TEXT'),
+    ('address_suite', 'TEXT'),
+    ('address_zipcode', 'TEXT'),
+    ('full_address', 'TEXT'),
+    ('etl_timestamp', 'TEXT'),  # 'YYYY-MM-DD HH:MM:SS.ffffff', como lo guardaba to_sql
+]
+INDICES_USUARIOS = ('email', 'username', 'address_city')
+
+# journal_mode=WAL queda guardado en el archivo; el resto vale por conexión.
+# synchronous=NORMAL es seguro con WAL (un corte de luz puede perder la última
+# transacción, no corromper la base) y evita un fsync por COMMIT
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,  # En KiB: 64 MiB de caché de páginas
+    'temp_store': 'MEMORY',  # Los ordenamientos de CREATE INDEX no van a disco
+    'mmap_size': 268435456,  # Lecturas con memory map de hasta 256 MiB
+}
+
+
+def ruta_desde_url(url: str) -> str:
+    """
+    Convierte un string de conexión de SQLAlchemy ('sqlite:///archivo.db') en la
+    ruta del archivo.
+    """
+    if not url.startswith('sqlite://'):
+        raise ValueError(f"No es un string de conexión de SQLite: {url}")
+    return url[len('sqlite:///'):] or ':memory:'
+
+
+def conectar(ruta: str, pragmas: Dict[str, Any] = PRAGMAS, solo_lectura: bool = False,
+             sentencias_en_cache: int = 128) -> sqlite3.Connection:
+    """
+    Abre la base con los PRAGMAs del almacén. La conexión queda en modo autocommit
+    (isolation_level=None): las transacciones se abren a mano con BEGIN.
+    Args:
+        ruta: Archivo de la base
+        pragmas: PRAGMAs a aplicar
+        solo_lectura: Abre la base en modo 'ro' (el modo WAL ya debe estar activo)
+        sentencias_en_cache: Sentencias preparadas que sqlite3 guarda por conexión; un
+            SQL que ya se ejecutó no se vuelve a compilar
+    """
+    if solo_lectura:
+        ruta = f"file:{ruta}?mode=ro"
+        pragmas = {nombre: valor for nombre, valor in pragmas.items() if nombre != 'journal_mode'}
+    conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None, check_same_thread=False,
+                               cached_statements=sentencias_en_cache, uri=solo_lectura)
+    for nombre, valor in pragmas.items():
+        conexion.execute(f"PRAGMA {nombre}={valor}")
+    return conexion
+
+
+def _filas(bloque: pd.DataFrame, columnas: Sequence[str]) -> Iterator[tuple]:
+    """
+    Tuplas de valores de Python para executemany (sqlite3 no acepta tipos de NumPy
+    ni pd.NA). Las fechas se formatean una vez por valor distinto: en una carga
+    todas suelen tener el mismo etl_timestamp.
+    """
+    valores = []
+    for columna in columnas:
+        serie = bloque[columna]
+        if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+            codigos, unicos = pd.factorize(serie)
+            textos = pd.Series(unicos.strftime('%Y-%m-%d %H:%M:%S.%f'), dtype=object)
+            serie = textos.reindex(codigos).set_axis(serie.index)
+        valores.append(serie.to_numpy(dtype=object, na_value=None).tolist())
+    return zip(*valores)
+
+
+def _existe_tabla(conexion: sqlite3.Connection, tabla: str) -> bool:
+    return conexion.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).fetchone() is not None
+
+
+def _marca_de_carga() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+class AlmacenSQLite(Destino):
+    """
+    Tabla de usuarios indexada en SQLite. Como los demás destinos: escribir() una o
+    más veces y cerrar() para reemplazar la tabla, o abortar() para dejarla como
+    estaba. Todo ocurre en una transacción que se abre al crear el almacén.
+    """
+    def __init__(self, ruta: str, tabla: str = 'users_data',
+                 columnas: Sequence[Tuple[str, str]] = COLUMNAS_USUARIOS,
+                 indices: Sequence[str] = INDICES_USUARIOS):
+        """
+        Args:
+            ruta: Archivo de la base (o string de conexión 'sqlite:///...')
+            tabla: Tabla que se reemplaza al cerrar
+            columnas: (nombre, tipo) de cada columna
+            indices: Columnas con índice secundario
+        """
+        self.ruta = ruta_desde_url(ruta) if ruta.startswith('sqlite://') else ruta
+        self.tabla = tabla
+        self.columnas = [nombre for nombre, _ in columnas]
+        self.indices = indices
+        self.filas = 0
+        self.tabla_nueva = f"{tabla}__nueva"
+        self._conexion = conectar(self.ruta)
+        try:
+            # IMMEDIATE toma el lock de escritura ya: otra carga espera en lugar de fallar al final
+            self._conexion.execute("BEGIN IMMEDIATE")
+            definicion = ', '.join(f"{nombre} {tipo}" for nombre, tipo in columnas)
+            self._conexion.execute(f"DROP TABLE IF EXISTS {self.tabla_nueva}")
+            self._conexion.execute(f"CREATE TABLE {self.tabla_nueva} ({definicion})")
+        except Exception:
+            # Nadie más va a llamar a abortar(): sin esto quedarían la conexión y el lock
+            self.abortar()
+            raise
+        marcadores = ', '.join('?' * len(self.columnas))
+        self._insert = f"INSERT INTO {self.tabla_nueva} ({', '.join(self.columnas)}) VALUES ({marcadores})"
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        faltantes = [columna for columna in self.columnas if columna not in bloque.columns]
+        if faltantes:
+            raise ValueError(f"Faltan columnas para la tabla {self.tabla}: {faltantes}")
+        self._conexion.executemany(self._insert, _filas(bloque, self.columnas))
+        self.filas += len(bloque)
+
+    def cerrar(self) -> None:
+        try:
+            # Los índices de la tabla anterior se borran con ella, así que los nombres se repiten
+            self._conexion.execute(f"DROP TABLE IF EXISTS {self.tabla}")
+            self._conexion.execute(f"ALTER TABLE {self.tabla_nueva} RENAME TO {self.tabla}")
+            for columna in self.indices:
+                self._conexion.execute(f"CREATE INDEX ix_{self.tabla}_{columna} ON {self.tabla} ({columna})")
+            # Las huellas de una carga incremental anterior ya no describen la tabla: la
+            # próxima carga incremental compara contra todo, y los consumidores del
+            # registro de cambios se enteran de que tienen que releer la tabla completa
+            self._conexion.execute(f"DROP TABLE IF EXISTS {self.tabla}__huellas")
+            if _existe_tabla(self._conexion, f"{self.tabla}__cambios"):
+                self._conexion.execute(f"INSERT INTO {self.tabla}__cambios (carga, operacion, id) VALUES (?, ?, NULL)",
+                                       (_marca_de_carga(), 'reload'))
+            self._conexion.execute("COMMIT")
+        except Exception:
+            self.abortar()
+            raise
+        # Actualiza las estadísticas que usa el planificador de consultas
+        self._conexion.execute("PRAGMA optimize")
+        self._conexion.close()
+
+    def abortar(self) -> None:
+        if self._conexion.in_transaction:
+            self._conexion.execute("ROLLBACK")
+        self._conexion.close()
+
+
+class CargaIncremental(Destino):
+    """
+    Carga CDC de la tabla de usuarios, en una sola transacción:
+      1. registrar_huellas(lote) con (id, huella) de cada usuario extraído devuelve los
+         ids nuevos o cambiados, con su operación, y los anota en el registro.
+      2. escribir(bloque) inserta o actualiza esas filas ya transformadas.
+      3. cerrar() borra los usuarios que no aparecieron en la extracción y confirma.
+    La transacción toma el lock de escritura (BEGIN IMMEDIATE) al crearse y lo tiene
+    hasta cerrar: si la extracción corre mientras tanto, otros escritores esperan
+    todo ese tiempo (o fallan tras el timeout de 30 s); los lectores siguen leyendo
+    la versión anterior gracias a WAL.
+    """
+    def __init__(self, ruta: str, tabla: str = 'users_data',
+                 columnas: Sequence[Tuple[str, str]] = COLUMNAS_USUARIOS,
+                 indices: Sequence[str] = INDICES_USUARIOS):
+        """
+        Args:
+            ruta: Archivo de la base (o string de conexión 'sqlite:///...')
+            tabla: Tabla de usuarios; se crea si no existe
+            columnas: (nombre, tipo) de cada columna; la primera es la clave primaria
+            indices: Columnas con índice secundario
+        """
+        self.ruta = ruta_desde_url(ruta) if ruta.startswith('sqlite://') else ruta
+        self.tabla = tabla
+        self.columnas = [nombre for nombre, _ in columnas]
+        self.carga = _marca_de_carga()
+        self.conteos = {'insert': 0, 'update': 0, 'delete': 0, 'unchanged': 0}
+        self.filas = 0
+        self._huellas = f"{tabla}__huellas"
+        self._cambios = f"{tabla}__cambios"
+        self._conexion = conectar(self.ruta)
+        self._conexion.execute("BEGIN IMMEDIATE")
+        try:
+            definicion = ', '.join(f"{nombre} {tipo}" for nombre, tipo in columnas)
+            self._conexion.execute(f"CREATE TABLE IF NOT EXISTS {tabla} ({definicion})")
+            for columna in indices:
+                self._conexion.execute(f"CREATE INDEX IF NOT EXISTS ix_{tabla}_{columna} ON {tabla} ({columna})")
+            clave = [fila[1] for fila in self._conexion.execute(f"PRAGMA table_info({tabla})") if fila[5]]
+            if clave != [self.columnas[0]]:
+                raise ValueError(f"La tabla {tabla} no tiene {self.columnas[0]} como clave primaria (¿la creó "
+                                 f"to_sql?); hace falta una carga completa con AlmacenSQLite antes de la incremental")
+            self._conexion.execute(f"CREATE TABLE IF NOT EXISTS {self._huellas} (id INTEGER PRIMARY KEY, huella BLOB)")
+            # AUTOINCREMENT: una secuencia nunca se reutiliza, aunque se poden cambios viejos
+            self._conexion.execute(f"CREATE TABLE IF NOT EXISTS {self._cambios} (secuencia INTEGER PRIMARY KEY "
+                                   f"AUTOINCREMENT, carga TEXT, operacion TEXT, id INTEGER)")
+            # Tablas temporales: ids vistos en toda la extracción y huellas del lote actual
+            self._conexion.execute("CREATE TEMP TABLE vistos (id INTEGER PRIMARY KEY)")
+            self._conexion.execute("CREATE TEMP TABLE lote (id INTEGER PRIMARY KEY, huella BLOB)")
+        except Exception:
+            self.abortar()
+            raise
+        otras = ', '.join(f"{columna} = excluded.{columna}" for columna in self.columnas[1:])
+        self._upsert = (f"INSERT INTO {tabla} ({', '.join(self.columnas)}) VALUES ({', '.join('?' * len(self.columnas))}) "
+                        f"ON CONFLICT({self.columnas[0]}) DO UPDATE SET {otras}")
+
+    def registrar_huellas(self, huellas: Sequence[Tuple[int, bytes]]) -> Dict[int, str]:
+        """
+        Compara las huellas de un lote de usuarios extraídos con las guardadas.
+        Args:
+            huellas: (id, huella) de cada usuario del lote
+        Returns:
+            Dict[int, str]: id -> 'insert' o 'update' de los usuarios que hay que escribir
+        """
+        self._conexion.execute("DELETE FROM lote")
+        self._conexion.executemany("INSERT OR REPLACE INTO lote (id, huella) VALUES (?, ?)", huellas)
+        self._conexion.execute("INSERT OR IGNORE INTO vistos (id) SELECT id FROM lote")
+        clave = self.columnas[0]
+        cambiados = dict(self._conexion.execute(
+            f"SELECT l.id, CASE WHEN t.{clave} IS NULL THEN 'insert' ELSE 'update' END FROM lote l "
+            f"LEFT JOIN {self._huellas} h ON h.id = l.id LEFT JOIN {self.tabla} t ON t.{clave} = l.id "
+            f"WHERE h.huella IS NOT l.huella"
+        ))
+        if cambiados:
+            self._conexion.executemany(f"INSERT INTO {self._cambios} (carga, operacion, id) VALUES (?, ?, ?)",
+                                       ((self.carga, operacion, id_) for id_, operacion in cambiados.items()))
+            self._conexion.execute(f"INSERT OR REPLACE INTO {self._huellas} (id, huella) SELECT l.id, l.huella "
+                                   f"FROM lote l LEFT JOIN {self._huellas} h ON h.id = l.id "
+                                   f"WHERE h.huella IS NOT l.huella")
+            for operacion in cambiados.values():
+                self.conteos[operacion] += 1
+        self.conteos['unchanged'] += len(huellas) - len(cambiados)
+        return cambiados
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        """
+        Inserta o actualiza filas transformadas (las devueltas por registrar_huellas).
+        """
+        self._conexion.executemany(self._upsert, _filas(bloque, self.columnas))
+        self.filas += len(bloque)
+
+    def cerrar(self) -> None:
+        """
+        Borra los usuarios que no estaban en la extracción y confirma la carga.
+        """
+        clave = self.columnas[0]
+        try:
+            if self._conexion.execute("SELECT 1 FROM vistos LIMIT 1").fetchone() is None:
+                raise ValueError("La extracción no devolvió usuarios; no se borra la tabla")
+            borrados = self._conexion.execute(
+                f"INSERT INTO {self._cambios} (carga, operacion, id) "
+                f"SELECT ?, 'delete', {clave} FROM {self.tabla} WHERE {clave} NOT IN (SELECT id FROM vistos)",
+                (self.carga,)
+            ).rowcount
+            self._conexion.execute(f"DELETE FROM {self.tabla} WHERE {clave} NOT IN (SELECT id FROM vistos)")
+            self._conexion.execute(f"DELETE FROM {self._huellas} WHERE id NOT IN (SELECT id FROM vistos)")
+            self.conteos['delete'] += borrados
+            self._conexion.execute("COMMIT")
+        except Exception:
+            self.abortar()
+            raise
+        self._conexion.close()
+
+    def abortar(self) -> None:
+        if self._conexion.in_transaction:
+            self._conexion.execute("ROLLBACK")
+        self._conexion.close()
@@ -0,0 +1,250 @@
+# -----------------------------------------------------
+# Columnas derivadas con kernels vectorizados
+# -----------------------------------------------------
+# Las columnas derivadas se declaran una vez, como
+#   {'nueva_columna': ('kernel', 'columna_origen', *argumentos)}
+# y aplicar_derivadas las calcula sobre columnas completas, en lugar de llamar a una
+# función de Python por fila con .apply: los kernels de texto de pyarrow.compute o
+# NumPy sobre los bytes UTF-8 del arreglo de Arrow (el tipo str de pandas ya los
+# guarda así, no hay copia). Sin pyarrow se usan los métodos .str de pandas.
+#
+# Kernels:
+#   longitud  -> len(texto), en caracteres
+#   palabras  -> len(texto.split())
+#   prefijo   -> texto[:n]
+#
+# Con 200.000 textos de ~200 bytes (1 CPU), longitud y prefijo son 15-30 veces más
+# rápidos que .apply en ASCII y 6-9 con acentos, donde hay que recorrer UTF-8.
+# palabras separa con utf8_split_whitespace (o ascii_split_whitespace), que arma las
+# listas de palabras para contarlas: queda en 1,4-1,6 veces, porque str.split() ya
+# está en C. Por eso el benchmark exige a cada kernel su propia aceleración
+# (ACELERACION_MINIMA) y no 10x a todos.
+#
+# Uso:
+#   python columnas_derivadas.py --benchmark 200000
+
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow es opcional: sin él se usan los métodos .str de pandas
+    pa = pc = None
+
+# Columnas derivadas del ejemplo de publicaciones (etl-ejemplo.py)
+DERIVADAS_PUBLICACIONES = {
+    'longitud_contenido': ('longitud', 'contenido'),
+    'palabras_contenido': ('palabras', 'contenido'),
+    'inicio_contenido': ('prefijo', 'contenido', 50),
+}
+
+def _a_arrow(serie: pd.Series):
+    # Con el tipo str de pandas (respaldado por Arrow) no se copia nada
+    arreglo = pa.array(serie, from_pandas=True)
+    if isinstance(arreglo, pa.ChunkedArray):
+        arreglo = arreglo.combine_chunks()
+    if not (pa.types.is_string(arreglo.type) or pa.types.is_large_string(arreglo.type)):
+        # Columnas de objetos sin ningún texto (todo nulos) o string_view
+        arreglo = arreglo.cast(pa.large_string())
+    return arreglo
+
+
+def _bytes_y_offsets(arreglo) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vista de NumPy sobre los bytes UTF-8 de un arreglo de strings de Arrow y los
+    offsets de cada fila dentro de esos bytes (sin copiar).
+    """
+    _, buffer_offsets, buffer_datos = arreglo.buffers()
+    tipo_offsets = np.int64 if pa.types.is_large_string(arreglo.type) else np.int32
+    offsets = np.frombuffer(buffer_offsets, dtype=tipo_offsets)[arreglo.offset:arreglo.offset + len(arreglo) + 1]
+    datos = np.frombuffer(buffer_datos, dtype=np.uint8) if buffer_datos is not None else np.empty(0, np.uint8)
+    return datos[offsets[0]:offsets[-1]], (offsets - offsets[0]).astype(np.int64)
+
+
+def _es_ascii(arreglo) -> bool:
+    # Si todos los bytes son ASCII, un carácter es un byte
+    datos, _ = _bytes_y_offsets(arreglo)
+    return not datos.size or datos.max() < 0x80
+
+
+def _contar_palabras(arreglo):
+    """
+    Cuenta len(texto.split()) de cada fila con los kernels de Arrow. utf8_split_whitespace
+    usa los mismos espacios que str.isspace(), pero deja una palabra vacía por cada borde
+    con espacios y otra para el texto vacío: se recorta antes y los vacíos cuentan 0.
+    """
+    datos, _ = _bytes_y_offsets(arreglo)
+    # En ASCII las versiones ascii_* son más rápidas, salvo que haya bytes 0x1c-0x1f:
+    # str.isspace() los considera espacios y ascii_split_whitespace no
+    if _es_ascii(arreglo) and not (datos - np.uint8(0x1c) <= 3).any():
+        recortar, separar = pc.ascii_trim_whitespace, pc.ascii_split_whitespace
+    else:
+        recortar, separar = pc.utf8_trim_whitespace, pc.utf8_split_whitespace
+    recortado = recortar(arreglo)
+    cantidad = pc.list_value_length(separar(recortado))
+    return pc.if_else(pc.equal(pc.binary_length(recortado), 0), 0, cantidad)
+
+
+def _enteros(valores: np.ndarray, nulos, indice: pd.Index) -> pd.Series:
+    # Sin nulos sale int64 de NumPy, igual que .apply(len); con nulos, Int64 de pandas
+    if nulos is None:
+        return pd.Series(valores.astype(np.int64, copy=False), index=indice)
+    return pd.Series(pd.arrays.IntegerArray(valores.astype(np.int64, copy=False), nulos), index=indice)
+
+
+def _nulos(arreglo):
+    return arreglo.is_null().to_numpy(zero_copy_only=False) if arreglo.null_count else None
+
+
+def longitud(serie: pd.Series) -> pd.Series:
+    if pc is None:
+        return serie.str.len()
+    arreglo = _a_arrow(serie)
+    # En ASCII la longitud en caracteres es la de bytes, que sale de los offsets
+    kernel = pc.binary_length if _es_ascii(arreglo) else pc.utf8_length
+    return _enteros(kernel(arreglo).fill_null(0).to_numpy(), _nulos(arreglo), serie.index)
+
+
+def palabras(serie: pd.Series) -> pd.Series:
+    if pc is None:
+        return serie.str.split().str.len()
+    arreglo = _a_arrow(serie)
+    return _enteros(_contar_palabras(arreglo).fill_null(0).to_numpy(), _nulos(arreglo), serie.index)
+
+
+def prefijo(serie: pd.Series, n: int) -> pd.Series:
+    if pc is None:
+        return serie.str.slice(0, n)
+    arreglo = _a_arrow(serie)
+    if _es_ascii(arreglo):
+        # Cortar bytes es más barato que recorrer caracteres UTF-8
+        resultado = pc.binary_slice(arreglo.view(pa.large_binary() if pa.types.is_large_string(arreglo.type)
+                                                 else pa.binary()), 0, n).view(arreglo.type)
+    else:
+        resultado = pc.utf8_slice_codeunits(arreglo, 0, n)
+    # Se envuelve el resultado de Arrow tal cual; to_pandas() lo copiaría a objetos de Python
+    dtype = serie.dtype if isinstance(serie.dtype, pd.StringDtype) else pd.StringDtype('pyarrow')
+    return pd.Series(pd.array(resultado, dtype=dtype), index=serie.index)
+
+
+KERNELS: Dict[str, Callable[..., pd.Series]] = {
+    'longitud': longitud,
+    'palabras': palabras,
+    'prefijo': prefijo,
+}
+
+
+def aplicar_derivadas(df: pd.DataFrame, derivadas: Dict[str, Tuple[Any, ...]]) -> pd.DataFrame:
+    """
+    Agrega al DataFrame las columnas derivadas declaradas.
+    Args:
+        df: DataFrame de origen (se modifica y se devuelve)
+        derivadas: {'nueva_columna': ('kernel', 'columna_origen', *argumentos)}
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas nuevas
+    """
+    for nombre, (kernel, columna, *argumentos) in derivadas.items():
+        if kernel not in KERNELS:
+            raise ValueError(f"Kernel de columna derivada desconocido: {kernel}")
+        df[nombre] = KERNELS[kernel](df[columna], *argumentos)
+    return df
+
+
+# -----------------------------------------------------
+# Microbenchmark
+# -----------------------------------------------------
+
+# Aceleración mínima de cada kernel sobre .apply, con textos ASCII y con acentos
+ACELERACION_MINIMA = {
+    'longitud': 5.0,
+    'palabras': 1.2,
+    'prefijo': 5.0,
+}
+
+# Lo que cada kernel reemplaza, función de Python por fila
+EQUIVALENTES_APPLY = {
+    'longitud': (len, ()),
+    'palabras': (lambda texto: len(texto.split()), ()),
+    'prefijo': (lambda texto: texto[:50], (50,)),
+}
+
+
+def textos_sinteticos(filas: int, acentos: bool = False) -> pd.Series:
+    """
+    Genera filas textos parecidos al contenido de las publicaciones de JSONPlaceholder:
+    cuatro líneas de palabras en latín separadas por saltos de línea. Con acentos, el
+    vocabulario incluye palabras con tildes y ñ.
+    """
+    rng = np.random.default_rng(0)
+    vocabulario = ['quia', 'et', 'suscipit', 'recusandae', 'consequuntur', 'expedita', 'reprehenderit',
+                   'molestiae', 'ut', 'quas', 'totam', 'nostrum', 'rerum', 'est', 'autem', 'sunt', 'rem',
+                   'eveniet', 'architecto']
+    if acentos:
+        vocabulario += ['año', 'acción', 'según', 'también']
+    vocabulario = np.array(vocabulario)
+    largos = rng.integers(20, 36, filas)
+    palabras_sueltas = vocabulario[rng.integers(0, len(vocabulario), largos.sum())]
+    textos = []
+    for grupo in np.split(palabras_sueltas, np.cumsum(largos)[:-1]):
+        lineas = np.array_split(grupo, 4)
+        textos.append('\n'.join(' '.join(linea) for linea in lineas))
+    return pd.Series(textos, dtype='str')
+
+
+def _mejor_tiempo(funcion: Callable[[], Any], repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def benchmark(filas: int = 200_000, repeticiones: int = 3, aceleracion_minima: Optional[float] = None) -> bool:
+    """
+    Compara cada kernel con su .apply equivalente sobre la misma columna, con textos
+    ASCII y con acentos, verifica que den el mismo resultado y marca los kernels que
+    no son al menos aceleracion_minima veces más rápidos (por defecto, la de cada
+    kernel en ACELERACION_MINIMA).
+    Returns:
+        bool: True si todos los kernels alcanzan la aceleración mínima
+    """
+    ok = True
+    for acentos in (False, True):
+        serie = textos_sinteticos(filas, acentos)
+        print(f"{filas} textos {'con' if acentos else 'sin'} acentos, mejor de {repeticiones} "
+              f"(pyarrow: {'sí' if pc is not None else 'no'})")
+        ok = _comparar_kernels(serie, repeticiones, aceleracion_minima) and ok
+    return ok
+
+
+def _comparar_kernels(serie: pd.Series, repeticiones: int, aceleracion_minima: Optional[float]) -> bool:
+    ok = True
+    for nombre, (funcion, argumentos) in EQUIVALENTES_APPLY.items():
+        kernel = KERNELS[nombre]
+        minima = ACELERACION_MINIMA[nombre] if aceleracion_minima is None else aceleracion_minima
+        esperado = serie.apply(funcion)
+        if not kernel(serie, *argumentos).astype(object).equals(esperado.astype(object)):
+            raise AssertionError(f"El kernel {nombre} no coincide con .apply")
+        con_apply = _mejor_tiempo(lambda: serie.apply(funcion), repeticiones)
+        con_kernel = _mejor_tiempo(lambda: kernel(serie, *argumentos), repeticiones)
+        aceleracion = con_apply / con_kernel
+        ok = ok and aceleracion >= minima
+        print(f"{nombre:>10}: apply {con_apply * 1000:8.1f} ms, kernel {con_kernel * 1000:7.1f} ms "
+              f"-> {aceleracion:5.1f}x {'OK' if aceleracion >= minima else 'LENTO'} (mínimo {minima:g}x)")
+    return ok
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Microbenchmark de los kernels de columnas derivadas")
+    parser.add_argument('--benchmark', type=int, metavar='FILAS', default=200_000, help="Filas de texto sintético")
+    parser.add_argument('--minimo', type=float,
+                        help="Aceleración exigida a todos los kernels (por defecto, la de ACELERACION_MINIMA)")
+    args = parser.parse_args()
+    sys.exit(0 if benchmark(args.benchmark, aceleracion_minima=args.minimo) else 1)
@@ -0,0 +1,176 @@
+# -----------------------------------------------------
+# Consultas de lectura sobre users_data
+# -----------------------------------------------------
+# API de lectura de la tabla que carga el pipeline de usuarios en el almacén SQLite
+# (almacen_sqlite.py): usuario por id, por email y usuarios de una ciudad, todas
+# resueltas con la clave primaria o un índice.
+#
+# - Una conexión de solo lectura por hilo (sqlite3 no comparte bien una conexión
+#   entre hilos) que se reutiliza en todas las consultas de ese hilo.
+# - El SQL de cada consulta es fijo: sqlite3 guarda la sentencia preparada en su
+#   caché por conexión y no la vuelve a compilar.
+# - Caché LRU de resultados compartida entre hilos. Se invalida cuando cambia la
+#   carga del ETL: si PRAGMA data_version indica que otra conexión escribió en la
+#   base, se lee MAX(etl_timestamp) (y la última secuencia del registro de cambios de
+#   las cargas incrementales, que pueden solo borrar) y, si cambió, se vacía la caché. Esa
+#   verificación cuesta tanto como una lectura, así que cada hilo la hace como mucho
+#   una vez cada intervalo_validacion segundos: ese es el máximo que la caché puede
+#   seguir respondiendo con la carga anterior.
+# - cambios_desde lee el registro de cambios de las cargas incrementales (CDC), para
+#   consumidores que se ponen al día sin releer la tabla.
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from almacen_sqlite import conectar, ruta_desde_url
+
+_SIN_RESULTADO = object()  # Distingue "no está en caché" de un usuario inexistente (None)
+
+
+class ConsultasUsuarios:
+    """Lecturas puntuales de users_data con conexiones por hilo y caché de resultados."""
+    def __init__(self, ruta: str, tabla: str = 'users_data', tamano_cache: int = 100_000,
+                 intervalo_validacion: float = 0.1):
+        """
+        Args:
+            ruta: Archivo de la base (o string de conexión 'sqlite:///...')
+            tabla: Tabla de usuarios
+            tamano_cache: Resultados que guarda la caché LRU (0 la desactiva)
+            intervalo_validacion: Segundos entre verificaciones de una carga nueva por
+                hilo (0 verifica en cada consulta)
+        """
+        self.ruta = ruta_desde_url(ruta) if ruta.startswith('sqlite://') else ruta
+        self.tabla = tabla
+        self.tamano_cache = tamano_cache
+        self.intervalo_validacion = intervalo_validacion
+        self.estadisticas = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+        self._sql = {
+            'id': f"SELECT * FROM {tabla} WHERE id = ?",
+            'email': f"SELECT * FROM {tabla} WHERE email = ? LIMIT 1",
+            'ciudad': f"SELECT * FROM {tabla} WHERE address_city = ? ORDER BY id",
+        }
+        self._sql_carga = (f"SELECT (SELECT MAX(etl_timestamp) FROM {tabla}), "
+                           f"(SELECT name FROM sqlite_master WHERE name = '{tabla}__cambios')")
+        self._sql_cambios = f"SELECT MAX(secuencia) FROM {tabla}__cambios"
+        self._sql_cambios_desde = (f"SELECT secuencia, carga, operacion, id FROM {tabla}__cambios "
+                                   f"WHERE secuencia > ? ORDER BY secuencia LIMIT ?")
+        self._local = threading.local()
+        self._conexiones = []
+        self._cache = OrderedDict()
+        self._carga = None  # (etl_timestamp, secuencia) de la carga a la que corresponde la caché
+        self._generacion = 0  # Aumenta con cada invalidación
+        self._lock = threading.Lock()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = conectar(self.ruta, solo_lectura=True)
+            conexion.row_factory = sqlite3.Row
+            self._local.conexion = conexion
+            self._local.data_version = None
+            self._local.proxima_validacion = 0.0
+            with self._lock:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def _validar(self, conexion: sqlite3.Connection) -> None:
+        """
+        Vacía la caché si hay una carga nueva desde la última verificación de este hilo.
+        """
+        ahora = time.monotonic()
+        if ahora < self._local.proxima_validacion:
+            return
+        self._local.proxima_validacion = ahora + self.intervalo_validacion
+        data_version = conexion.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._local.data_version:
+            return
+        self._local.data_version = data_version
+        marca, registro = conexion.execute(self._sql_carga).fetchone()
+        carga = (marca, conexion.execute(self._sql_cambios).fetchone()[0] if registro else None)
+        with self._lock:
+            if carga != self._carga:
+                if self._carga is not None:
+                    self.estadisticas['invalidaciones'] += 1
+                self._carga = carga
+                self._generacion += 1
+                self._cache.clear()
+
+    def _consultar(self, consulta: str, valor: Any, uno: bool):
+        conexion = self._conexion()
+        if not self.tamano_cache:
+            cursor = conexion.execute(self._sql[consulta], (valor,))
+            return cursor.fetchone() if uno else tuple(cursor.fetchall())
+        self._validar(conexion)
+        clave = (consulta, valor)
+        with self._lock:
+            resultado = self._cache.get(clave, _SIN_RESULTADO)
+            if resultado is not _SIN_RESULTADO:
+                self._cache.move_to_end(clave)
+                self.estadisticas['aciertos'] += 1
+                return resultado
+            self.estadisticas['fallos'] += 1
+            generacion = self._generacion
+        cursor = conexion.execute(self._sql[consulta], (valor,))
+        # sqlite3.Row es inmutable: el mismo resultado se puede entregar a varios hilos
+        resultado = cursor.fetchone() if uno else tuple(cursor.fetchall())
+        with self._lock:
+            # Si hubo una invalidación durante la consulta, el resultado puede ser de la carga anterior
+            if generacion == self._generacion:
+                self._cache[clave] = resultado
+                if len(self._cache) > self.tamano_cache:
+                    self._cache.popitem(last=False)
+        return resultado
+
+    def usuario_por_id(self, usuario_id: int) -> Optional[sqlite3.Row]:
+        """
+        Usuario con ese id, o None.
+        """
+        return self._consultar('id', int(usuario_id), True)
+
+    def buscar_por_email(self, email: str) -> Optional[sqlite3.Row]:
+        """
+        Usuario con ese email, o None. El pipeline guarda los emails en minúsculas.
+        """
+        return self._consultar('email', email.lower(), True)
+
+    def usuarios_en_ciudad(self, ciudad: str) -> Tuple[sqlite3.Row, ...]:
+        """
+        Usuarios de una ciudad (address_city), ordenados por id.
+        """
+        return self._consultar('ciudad', ciudad, False)
+
+    def cambios_desde(self, secuencia: int = 0, limite: int = 10_000) -> Tuple[sqlite3.Row, ...]:
+        """
+        Cambios de las cargas incrementales posteriores a secuencia, en orden: filas
+        (secuencia, carga, operacion, id) con operacion 'insert', 'update' o 'delete'.
+        'reload' (con id nulo) indica una carga completa: hay que releer la tabla. El
+        consumidor guarda la última secuencia procesada y la pasa en la próxima llamada.
+        """
+        conexion = self._conexion()
+        if conexion.execute(f"SELECT 1 FROM sqlite_master WHERE name = '{self.tabla}__cambios'").fetchone() is None:
+            return ()  # Todavía no hubo cargas incrementales
+        return tuple(conexion.execute(self._sql_cambios_desde, (secuencia, limite)).fetchall())
+
+    def tasa_aciertos(self) -> float:
+        consultas = self.estadisticas['aciertos'] + self.estadisticas['fallos']
+        return self.estadisticas['aciertos'] / consultas if consultas else 0.0
+
+    def cerrar(self) -> None:
+        """
+        Cierra las conexiones de todos los hilos.
+        """
+        with self._lock:
+            conexiones, self._conexiones = self._conexiones, []
+        for conexion in conexiones:
+            conexion.close()
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
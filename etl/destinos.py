@@ -0,0 +1,368 @@
+# -----------------------------------------------------
+# Destinos de carga de los ejemplos ETL
+# -----------------------------------------------------
+# Todos los destinos se usan igual: escribir(bloque) una o más veces con DataFrames
+# del mismo esquema y cerrar() al final. Como context manager, cierran si el bloque
+# with termina bien y descartan lo escrito si falla.
+#
+# - DestinoCSV: texto, como hasta ahora.
+# - DestinoParquet: columnar, comprimido (zstd por defecto) y con estadísticas
+#   min/max/nulos por grupo de filas, que los lectores usan para saltar grupos.
+# - DestinoArrowIPC: formato de Arrow en disco; sin compresión (el valor por defecto)
+#   se lee con memory map sin copiar ni decodificar nada.
+# - DestinoSQL: to_sql dentro de una transacción.
+#
+# Parquet y Arrow IPC aceptan columnas de partición: se escribe un archivo por valor
+# en carpetas columna=valor (estilo Hive), pensadas para columnas de pocos valores.
+# pyarrow solo se importa si se usa uno de estos dos destinos.
+
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import quote
+
+import pandas as pd
+
+# Nombre que usa Hive (y pyarrow al leer) para la partición de valores nulos
+PARTICION_NULA = '__HIVE_DEFAULT_PARTITION__'
+
+
+class Destino:
+    """Interfaz común de los destinos de carga."""
+    filas = 0
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def cerrar(self) -> None:
+        """Confirma lo escrito."""
+
+    def abortar(self) -> None:
+        """Descarta lo escrito; el destino anterior, si existía, queda como estaba."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.abortar()
+        return False
+
+
+class DestinoCSV(Destino):
+    """CSV escrito en un temporal que reemplaza a la ruta al cerrar."""
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._temporal = f"{ruta}.tmp"
+        self._archivo = open(self._temporal, 'w', newline='')
+        self._encabezado_escrito = False  # Con un primer bloque vacío filas sigue en 0
+        self.filas = 0
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        bloque.to_csv(self._archivo, index=False, header=not self._encabezado_escrito)
+        self._encabezado_escrito = True
+        self.filas += len(bloque)
+
+    def escribir_texto(self, texto: str, filas: int) -> None:
+        """
+        Agrega un bloque ya formateado como CSV (por ejemplo, en otro proceso); el
+        primero debe traer el encabezado.
+        """
+        self._archivo.write(texto)
+        self._encabezado_escrito = True
+        self.filas += filas
+
+    def cerrar(self) -> None:
+        self._archivo.close()
+        os.replace(self._temporal, self.ruta)
+
+    def abortar(self) -> None:
+        self._archivo.close()
+        os.remove(self._temporal)
+
+
+class _DestinoColumnar(Destino):
+    """
+    Base de Parquet y Arrow IPC: los primeros bloques fijan el esquema y los siguientes
+    se convierten a él. Una columna sin ningún valor en un bloque sale con tipo null (o
+    double, si pandas la leyó como NaN), así que los bloques se guardan en memoria hasta
+    que cada columna tuvo algún valor, o hasta bloques_sin_tipo bloques; después las
+    columnas que sigan sin valores quedan con el tipo del primer bloque. Sin particiones
+    se escribe un solo archivo; con particiones, uno por combinación de valores, que
+    queda abierto hasta cerrar.
+    """
+    extension = None
+    bloques_sin_tipo = 8
+
+    def __init__(self, ruta: str, particiones: Sequence[str] = (), compresion: Optional[str] = None):
+        self.ruta = ruta
+        self.particiones = list(particiones)
+        self.compresion = compresion
+        self.filas = 0
+        self._temporal = f"{ruta}.tmp"
+        self._esquema = None
+        self._esquema_inicial = None  # Esquema del primer bloque, mientras falten tipos
+        self._tipos = {}  # Columna -> tipo del primer bloque en que tuvo valores
+        self._pendientes = []  # (archivo, datos) escritos antes de fijar el esquema
+        self._escritores = {}  # Ruta del archivo -> escritor abierto
+        self._limpiar(self._temporal)  # Restos de una escritura fallida
+
+    @staticmethod
+    def _limpiar(ruta: str) -> None:
+        if os.path.isdir(ruta):
+            shutil.rmtree(ruta)
+        elif os.path.exists(ruta):
+            os.remove(ruta)
+
+    def _abrir_escritor(self, archivo: str):
+        raise NotImplementedError
+
+    def _escribir_en(self, escritor, tabla) -> None:
+        escritor.write_table(tabla)
+
+    def _escribir_tabla(self, archivo: str, datos: pd.DataFrame) -> None:
+        import pyarrow as pa
+        if self._esquema is None:
+            esquema = pa.Schema.from_pandas(datos, preserve_index=False)
+            if self._esquema_inicial is None:
+                self._esquema_inicial = esquema
+            for campo in esquema:
+                if campo.name not in self._tipos and datos[campo.name].notna().any():
+                    self._tipos[campo.name] = campo.type
+            self._pendientes.append((archivo, datos))
+            if len(self._tipos) == len(esquema) or len(self._pendientes) >= self.bloques_sin_tipo:
+                self._fijar_esquema()
+            return
+        tabla = pa.Table.from_pandas(datos, schema=self._esquema, preserve_index=False)
+        escritor = self._escritores.get(archivo)
+        if escritor is None:
+            escritor = self._escritores[archivo] = self._abrir_escritor(archivo)
+        self._escribir_en(escritor, tabla)
+
+    def _fijar_esquema(self) -> None:
+        import pyarrow as pa
+        esquema = self._esquema_inicial
+        for nombre, tipo in self._tipos.items():
+            esquema = esquema.set(esquema.get_field_index(nombre), pa.field(nombre, tipo))
+        self._esquema = esquema
+        pendientes, self._pendientes = self._pendientes, []
+        for archivo, datos in pendientes:
+            self._escribir_tabla(archivo, datos)
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        if not self.particiones:
+            self._escribir_tabla(self._temporal, bloque)
+        else:
+            datos = bloque.drop(columns=self.particiones)
+            for valores, indices in bloque.groupby(self.particiones, sort=False, dropna=False).indices.items():
+                valores = valores if isinstance(valores, tuple) else (valores,)
+                carpeta = os.path.join(self._temporal, *(
+                    f"{columna}={PARTICION_NULA if pd.isna(valor) else quote(str(valor), safe='')}"
+                    for columna, valor in zip(self.particiones, valores)
+                ))
+                os.makedirs(carpeta, exist_ok=True)
+                self._escribir_tabla(os.path.join(carpeta, f"parte-0.{self.extension}"), datos.iloc[indices])
+        self.filas += len(bloque)
+
+    def _cerrar_escritores(self) -> None:
+        for escritor in self._escritores.values():
+            escritor.close()
+        self._escritores = {}
+
+    def cerrar(self) -> None:
+        if self._pendientes:
+            self._fijar_esquema()
+        self._cerrar_escritores()
+        if self._esquema is None:
+            raise ValueError(f"No se escribió ningún bloque en {self.ruta}")
+        # Un archivo se reemplaza de forma atómica; una carpeta de particiones, no
+        self._limpiar(self.ruta)
+        os.replace(self._temporal, self.ruta)
+
+    def abortar(self) -> None:
+        self._pendientes = []
+        self._cerrar_escritores()
+        self._limpiar(self._temporal)
+
+
+class DestinoParquet(_DestinoColumnar):
+    """Parquet comprimido, con estadísticas por grupo de filas (un grupo por bloque o cada filas_por_grupo)."""
+    extension = 'parquet'
+
+    def __init__(self, ruta: str, particiones: Sequence[str] = (), compresion: Optional[str] = 'zstd',
+                 filas_por_grupo: int = 1_000_000):
+        super().__init__(ruta, particiones, compresion)
+        self.filas_por_grupo = filas_por_grupo
+
+    def _abrir_escritor(self, archivo: str):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(archivo, self._esquema, compression=self.compresion or 'none',
+                                write_statistics=True)
+
+    def _escribir_en(self, escritor, tabla) -> None:
+        escritor.write_table(tabla, row_group_size=self.filas_por_grupo)
+
+
+class DestinoArrowIPC(_DestinoColumnar):
+    """Archivo Arrow IPC (Feather v2); con compresión ('zstd' o 'lz4') ya no se lee sin copiar."""
+    extension = 'arrow'
+
+    def _abrir_escritor(self, archivo: str):
+        import pyarrow as pa
+        opciones = pa.ipc.IpcWriteOptions(compression=self.compresion)
+        return pa.ipc.new_file(archivo, self._esquema, options=opciones)
+
+
+class DestinoSQL(Destino):
+    """
+    Tabla de una base de datos: el primer bloque reemplaza la tabla y los siguientes
+    se agregan, todo en una transacción que se confirma al cerrar.
+    """
+    def __init__(self, conexion: Any, tabla: str, chunksize: int = 1000, method: Optional[str] = None):
+        """
+        Args:
+            conexion: Engine de SQLAlchemy o string de conexión
+            tabla: Tabla de destino
+            chunksize, method: Se pasan a DataFrame.to_sql
+        """
+        if isinstance(conexion, str):
+            from sqlalchemy import create_engine
+            conexion = create_engine(conexion)
+        self.tabla = tabla
+        self.chunksize = chunksize
+        self.method = method
+        self.filas = 0
+        self._conexion = conexion.connect()
+        self._sqlite = conexion.dialect.name == 'sqlite'
+        self._transaccion = self._conexion.begin()
+        if self._sqlite:
+            # sqlite3 confirma DROP/CREATE TABLE por su cuenta; con la transacción abierta
+            # a mano, el reemplazo de la tabla también se deshace al abortar
+            self._conexion.connection.driver_connection.isolation_level = None
+            self._conexion.exec_driver_sql("BEGIN")
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        bloque.to_sql(self.tabla, self._conexion, if_exists='replace' if self.filas == 0 else 'append',
+                      index=False, chunksize=self.chunksize, method=self.method)
+        self.filas += len(bloque)
+
+    def cerrar(self) -> None:
+        self._transaccion.commit()
+        self._liberar()
+
+    def abortar(self) -> None:
+        self._transaccion.rollback()
+        self._liberar()
+
+    def _liberar(self) -> None:
+        if self._sqlite:
+            self._conexion.connection.driver_connection.isolation_level = ''  # El valor por defecto
+        self._conexion.close()
+
+
+DESTINOS = {'csv': DestinoCSV, 'parquet': DestinoParquet, 'ipc': DestinoArrowIPC, 'sql': DestinoSQL}
+
+
+def crear_destino(formato: str, ruta: Any, **opciones: Any) -> Destino:
+    """
+    Crea un destino por nombre de formato.
+    Args:
+        formato: 'csv', 'parquet', 'ipc' o 'sql'
+        ruta: Archivo o carpeta de salida; para 'sql', el engine o string de conexión
+        opciones: Argumentos propios del destino (particiones, compresion, tabla, ...)
+    """
+    if formato not in DESTINOS:
+        raise ValueError(f"Formato de destino desconocido: {formato}")
+    return DESTINOS[formato](ruta, **opciones)
+
+
+def leer(ruta: str, columnas: Optional[List[str]] = None, filtro: Any = None):
+    """
+    Lee un archivo o carpeta escrita por DestinoParquet o DestinoArrowIPC como tabla de
+    Arrow, leyendo solo las columnas pedidas. El filtro (expresión de pyarrow.dataset,
+    por ejemplo ds.field('id') < 1000) descarta grupos de filas por sus estadísticas
+    en Parquet y carpetas por el valor de la partición. Un archivo Arrow IPC se abre
+    con memory map.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    es_ipc = ruta.endswith('.arrow')
+    if es_ipc and os.path.isfile(ruta) and filtro is None:
+        with pa.memory_map(ruta) as origen:
+            tabla = pa.ipc.open_file(origen).read_all()
+        return tabla.select(columnas) if columnas else tabla
+    dataset = ds.dataset(ruta, format='ipc' if es_ipc else 'parquet', partitioning='hive')
+    return dataset.to_table(columns=columnas, filter=filtro)
+
+
+# -----------------------------------------------------
+# Benchmark de lectura
+# -----------------------------------------------------
+
+def _cronometrar(funcion) -> float:
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def _tamano(ruta: str) -> int:
+    if os.path.isfile(ruta):
+        return os.path.getsize(ruta)
+    return sum(os.path.getsize(os.path.join(carpeta, archivo))
+               for carpeta, _, archivos in os.walk(ruta) for archivo in archivos)
+
+
+def benchmark_lectura(filas: int = 5_000_000) -> Dict[str, Dict[str, float]]:
+    """
+    Escribe un catálogo sintético de productos en CSV, Parquet y Arrow IPC y compara
+    cuánto tarda volver a leerlo: completo, dos columnas y el 1% de las filas por id.
+    """
+    import tempfile
+    import pyarrow.dataset as ds
+    from productos_csv import generar_productos, transformar_csv
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        origen = os.path.join(directorio, 'productos.csv')
+        generar_productos(origen, filas)
+        corte = filas // 100
+        rutas = {formato: os.path.join(directorio, f"productos_transformados.{extension}")
+                 for formato, extension in (('csv', 'csv'), ('parquet', 'parquet'), ('ipc', 'arrow'))}
+        for formato, ruta in rutas.items():
+            transformar_csv(origen, ruta, chunksize=500_000, formato=formato)
+
+        ruta_csv = rutas['csv']
+        lecturas = {
+            'csv': {
+                'completo': lambda: pd.read_csv(ruta_csv),
+                'dos columnas': lambda: pd.read_csv(ruta_csv, usecols=['id', 'precio_con_iva']),
+                '1% por id': lambda: pd.concat(b[b['id'] < corte] for b in pd.read_csv(ruta_csv, chunksize=500_000)),
+            },
+        }
+        for formato in ('parquet', 'ipc'):
+            ruta = rutas[formato]
+            lecturas[formato] = {
+                'completo': lambda ruta=ruta: leer(ruta).to_pandas(),
+                'dos columnas': lambda ruta=ruta: leer(ruta, ['id', 'precio_con_iva']).to_pandas(),
+                '1% por id': lambda ruta=ruta: leer(ruta, filtro=ds.field('id') < corte).to_pandas(),
+            }
+
+        print(f"{filas} filas")
+        for formato, casos in lecturas.items():
+            resultados[formato] = {'MB': _tamano(rutas[formato]) / 1e6}
+            resultados[formato].update({caso: _cronometrar(funcion) for caso, funcion in casos.items()})
+            tiempos = ", ".join(f"{caso} {segundos:.2f}s" for caso, segundos in resultados[formato].items() if caso != 'MB')
+            print(f"{formato:>8}: {resultados[formato]['MB']:6.1f} MB; {tiempos}")
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Destinos de carga y benchmark de lectura")
+    parser.add_argument('--benchmark', type=int, metavar='FILAS', default=5_000_000,
+                        help="Filas del catálogo sintético")
+    args = parser.parse_args()
+    benchmark_lectura(args.benchmark)
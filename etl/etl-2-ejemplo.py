@@ -1,15 +1,32 @@
 import requests  # Para realizar solicitudes HTTP (API)
+import aiohttp  # Para solicitudes HTTP asíncronas con conexiones reutilizables
+import asyncio  # Para la extracción asíncrona
 import pandas as pd  # Para manipulación de datos en DataFrame
+import numpy as np  # Para generar datos sintéticos en los benchmarks
 import psycopg2  # Para interactuar con la base de datos PostgreSQL
 from datetime import datetime, timedelta  # Para manipular fechas y horas
 import logging  # Para la gestión de logs
-from typing import List, Dict, Any  # Para las anotaciones de tipos
-from sqlalchemy import create_engine  # Para conectarse a PostgreSQL usando SQLAlchemy
-from concurrent.futures import ThreadPoolExecutor  # Para la ejecución de tareas paralelas
+from typing import List, Dict, Any, Tuple, Iterable  # Para las anotaciones de tipos
+from sqlalchemy import create_engine, text  # Para conectarse a PostgreSQL usando SQLAlchemy
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED  # Para la ejecución de tareas paralelas
 import json  # Para manejar datos JSON
-from retry import retry  # Para reintentar solicitudes fallidas
+import io  # Búfer en memoria para COPY FROM STDIN
+import time  # Para medir tiempos en los benchmarks
+import threading  # Para levantar el servidor stub y el bucle asíncrono en segundo plano
+import queue  # Cola acotada entre el bucle asíncrono y el consumidor
+import argparse  # Para los argumentos de línea de comandos
+import multiprocessing  # Procesos aislados para medir el pico de memoria en los benchmarks
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Servidor HTTP local para benchmarks
+from urllib.parse import urlparse, parse_qs  # Para interpretar las solicitudes del servidor stub
+import heapq  # Cola de reintentos ordenada por instante de reintento
+import itertools  # Contador de desempate para la cola de reintentos
+import random  # Jitter del backoff
 import os  # Para manejar variables de entorno
+import sys  # Código de salida del benchmark de fallos
+import sqlite3  # Para persistir la caché de respuestas en disco
+from collections import OrderedDict, deque  # Orden LRU de la caché y ventana del circuit breaker
 from dotenv import load_dotenv  # Para cargar las variables de entorno desde un archivo .env
+from instrumentacion import Instrumentacion, en_contexto, medir_etapa  # Métricas por etapa y por llamada HTTP
 
 # Configuración de logging: Permite registrar mensajes en archivo y consola
 logging.basicConfig(
@@ -19,11 +36,236 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)  # Se crea un logger para registrar los eventos
 
+# Campos extraídos de cada respuesta, en el orden en que se cargan
+WEATHER_FIELDS = ['city_name', 'temperature', 'feels_like', 'humidity', 'pressure', 'wind_speed',
+                  'description', 'timestamp', 'sunrise', 'sunset']
+# Categorías de temperatura precalculadas: límites superiores (incluidos) de Cold, Mild y Warm
+TEMP_CATEGORY_DTYPE = pd.CategoricalDtype(['Cold', 'Mild', 'Warm', 'Hot'], ordered=True)
+TEMP_CATEGORY_EDGES = np.array([10, 20, 30])
+
+# Definición de la tabla de destino ({table} se reemplaza por el nombre de la tabla)
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id SERIAL PRIMARY KEY,
+    city_name VARCHAR(100),
+    temperature FLOAT,
+    feels_like FLOAT,
+    humidity INTEGER,
+    pressure INTEGER,
+    wind_speed FLOAT,
+    description VARCHAR(200),
+    timestamp TIMESTAMP,
+    sunrise TIMESTAMP,
+    sunset TIMESTAMP,
+    day_length FLOAT,
+    is_night BOOLEAN,
+    temp_category VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+class WeatherResponseCache:
+    """
+    Caché de respuestas de la API con expiración (TTL) y desalojo LRU, con clave
+    (lat, lon, units). Si se indica una ruta, las respuestas se guardan también en
+    SQLite para que sobrevivan a un reinicio del proceso. Se escriben en transacciones
+    cortas de batch_size respuestas, así otra ejecución que comparte el archivo solo
+    espera lo que dura un lote
+    """
+    def __init__(self, ttl: float = 600, max_entries: int = 10000, path: str = None, batch_size: int = 100):
+        self.ttl = ttl  # Segundos de validez: OpenWeatherMap actualiza 'dt' cada ~10 minutos
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        self._entries = OrderedDict()  # clave -> (guardado_en, respuesta), de menos a más reciente
+        self._lock = threading.Lock()  # La caché se comparte entre los hilos de extracción
+        self._db = None
+        self._pending = []  # Filas todavía no escritas en disco
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS weather_cache ("
+                "lat REAL, lon REAL, units TEXT, stored_at REAL, payload TEXT, "
+                "PRIMARY KEY (lat, lon, units))"
+            )
+            self.flush()  # Descarta lo que expiró mientras el proceso no corría
+
+    def get(self, key: Tuple[float, float, str]) -> Dict[str, Any]:
+        """
+        Devuelve la respuesta guardada o None si no existe o ya expiró
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT stored_at, payload FROM weather_cache WHERE lat = ? AND lon = ? AND units = ?", key
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key: Tuple[float, float, str], payload: Dict[str, Any]) -> None:
+        """
+        Guarda una respuesta; en disco se escribe al juntar batch_size o al llamar a flush()
+        """
+        entry = (time.time(), payload)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._pending.append((*key, entry[0], json.dumps(payload)))
+                if len(self._pending) >= self.batch_size:
+                    self._write_pending()
+
+    def flush(self) -> None:
+        """
+        Escribe en disco las respuestas pendientes y borra las filas expiradas
+        """
+        if self._db is None:
+            return
+        with self._lock:
+            self._write_pending(purge=True)
+
+    def _write_pending(self, purge: bool = False) -> None:
+        # Se llama con el lock tomado; cada llamada es una transacción
+        rows, self._pending = self._pending, []
+        try:
+            with self._db:  # Confirma al salir o deshace si falla
+                self._db.executemany("INSERT OR REPLACE INTO weather_cache VALUES (?, ?, ?, ?, ?)", rows)
+                if purge:
+                    self._db.execute("DELETE FROM weather_cache WHERE stored_at < ?", (time.time() - self.ttl,))
+        except sqlite3.OperationalError as e:
+            # Por ejemplo, 'database is locked' si otra ejecución escribe en el mismo archivo:
+            # las respuestas siguen en memoria, solo no quedan en disco
+            logger.warning(f"Response cache not written to disk: {e}")
+
+    def _remember(self, key, entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:  # Desaloja la entrada usada hace más tiempo
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+
+class CircuitOpenError(Exception):
+    """
+    Se lanza cuando el circuit breaker de un host rechaza la solicitud sin llegar a la red
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por host: se abre cuando al menos failure_ratio de las últimas
+    window_size solicitudes fallaron y rechaza solicitudes durante reset_timeout
+    segundos; luego deja pasar una de prueba
+    """
+    def __init__(self, failure_ratio: float = 0.8, window_size: int = 20, reset_timeout: float = 30):
+        self.failure_ratio = failure_ratio
+        self.reset_timeout = reset_timeout
+        self.outcomes = deque(maxlen=window_size)  # True = falló
+        self.opened_at = None  # None mientras el circuito está cerrado
+        self.probing = False  # True mientras la solicitud de prueba del estado semiabierto está en vuelo
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()  # Semiabierto: pasa una prueba y el resto sigue esperando
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.opened_at = None
+            self.probing = False
+            self.outcomes.append(False)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                # Solo el fallo de la prueba reabre el circuito; los de solicitudes que ya
+                # estaban en vuelo al abrirse no extienden la espera
+                if self.probing:
+                    self.opened_at = time.monotonic()
+                    self.probing = False
+                return
+            self.outcomes.append(True)
+            # Con la mitad de la ventana como mínimo, unos pocos fallos al inicio no abren el circuito
+            if (len(self.outcomes) * 2 >= self.outcomes.maxlen
+                    and sum(self.outcomes) >= self.failure_ratio * len(self.outcomes)):
+                self.opened_at = time.monotonic()
+                self.outcomes.clear()
+
+
 class WeatherDataETL:
     def __init__(self):
         load_dotenv()  # Carga las variables de entorno desde el archivo .env
+        # Métricas de cada etapa y llamada HTTP (se exportan si ETL_METRICS_PATH está definido)
+        self.instrumentacion = Instrumentacion('weather')
         # Parámetros de la API y la base de datos, tomados desde las variables de entorno
         self.api_key = os.getenv('WEATHER_API_KEY')  
+        self.api_base = os.getenv('WEATHER_API_BASE', 'https://api.openweathermap.org/data/2.5')  # Base de la API
+        # Parámetros de la extracción: modo ('threaded' o 'async'), hilos y solicitudes simultáneas
+        self.extraction_mode = os.getenv('WEATHER_EXTRACTION_MODE', 'threaded')
+        self.max_workers = int(os.getenv('WEATHER_MAX_WORKERS', '4'))
+        self.max_concurrency = int(os.getenv('WEATHER_MAX_CONCURRENCY', '100'))
+        self.request_timeout = float(os.getenv('WEATHER_REQUEST_TIMEOUT', '10'))
+        # Ciudades en la misma celda de grilla comparten respuesta (2 decimales ≈ 1 km)
+        self.grid_precision = int(os.getenv('WEATHER_GRID_PRECISION', '2'))
+        # Ciudades con 'id' de OpenWeatherMap se piden en lotes (el endpoint 'group' acepta hasta 20)
+        self.batch_size = min(int(os.getenv('WEATHER_BATCH_SIZE', '20')), 20)
+        # Reintentos sin bloquear los hilos: backoff exponencial con jitter y circuit breaker por host
+        self.max_attempts = int(os.getenv('WEATHER_MAX_ATTEMPTS', '3'))
+        self.backoff_base = float(os.getenv('WEATHER_BACKOFF_BASE', '1'))
+        self.backoff_cap = float(os.getenv('WEATHER_BACKOFF_CAP', '30'))
+        self.breaker_ratio = float(os.getenv('WEATHER_BREAKER_RATIO', '0.8'))
+        self.breaker_window = int(os.getenv('WEATHER_BREAKER_WINDOW', '20'))
+        self.breaker_reset = float(os.getenv('WEATHER_BREAKER_RESET', '30'))
+        self._breakers = {}  # host -> CircuitBreaker
+        self._breakers_lock = threading.Lock()
+        self.last_run_stats = {}  # Estadísticas de la última extracción
+        self.failed_cities = []  # Ciudades que no se pudieron extraer en la última ejecución
+        # Caché de respuestas: WEATHER_CACHE_TTL=0 la desactiva, WEATHER_CACHE_PATH la persiste en SQLite
+        cache_ttl = float(os.getenv('WEATHER_CACHE_TTL', '600'))
+        self.cache = WeatherResponseCache(
+            ttl=cache_ttl,
+            max_entries=int(os.getenv('WEATHER_CACHE_SIZE', '10000')),
+            path=os.getenv('WEATHER_CACHE_PATH')
+        ) if cache_ttl > 0 else None
+        # Sesión compartida por los hilos para reutilizar conexiones keep-alive
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Carga: 'copy' (COPY FROM STDIN) o 'insert' (to_sql); filas por bloque enviado a COPY
+        self.load_method = os.getenv('WEATHER_LOAD_METHOD', 'copy')
+        self.copy_chunk_rows = int(os.getenv('WEATHER_COPY_CHUNK_ROWS', '100000'))
+        # Modo de carga: 'append' agrega todo, 'upsert' solo las observaciones nuevas por (city_name, timestamp)
+        self.load_mode = os.getenv('WEATHER_LOAD_MODE', 'append')
+        # Transformación: 'columnar' construye el DataFrame desde columnas tipadas, 'records' desde diccionarios
+        self.transform_engine = os.getenv('WEATHER_TRANSFORM_ENGINE', 'columnar')
+        # Pipeline: 'batch' extrae todo antes de cargar, 'stream' carga micro-lotes a medida que llegan
+        self.pipeline_mode = os.getenv('WEATHER_PIPELINE_MODE', 'batch')
+        self.stream_batch_size = int(os.getenv('WEATHER_STREAM_BATCH_SIZE', '5000'))
+        self.on_conflict = os.getenv('WEATHER_ON_CONFLICT', 'nothing')  # 'nothing' o 'update'
+        # Marca de agua del upsert: descarta observaciones anteriores a la última cargada de cada
+        # ciudad. Con '0' se envía todo y el índice único descarta los repetidos (para rellenar huecos)
+        self.upsert_watermark = os.getenv('WEATHER_UPSERT_WATERMARK', '1') == '1'
+        self._engine = None  # Se crea en la primera carga y se reutiliza
+        self._ready_tables = set()  # Tablas cuyo CREATE TABLE ya se ejecutó
         self.db_params = {
             'host': os.getenv('DB_HOST', 'localhost'),
             'database': os.getenv('DB_NAME', 'weather_db'),
@@ -39,49 +281,415 @@ class WeatherDataETL:
             {'name': 'Sevilla', 'lat': 37.3891, 'lon': -5.9845}
         ]
 
-    # Función de reintento para manejar fallos de la API (hasta 3 intentos)
-    @retry(tries=3, delay=2, backoff=2)
-    def extract_weather_data(self, city: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_params(self, city: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Extrae datos meteorológicos de la API OpenWeatherMap para una ciudad
+        Construye los parámetros de la solicitud para una ciudad
         """
-        url = f"https://api.openweathermap.org/data/2.5/weather"  # URL de la API
         params = {
             'lat': city['lat'],  # Latitud de la ciudad
             'lon': city['lon'],  # Longitud de la ciudad
             'appid': self.api_key,  # API Key para autenticar la solicitud
             'units': 'metric'  # Unidades métricas para la temperatura (Celsius)
         }
-        
+        return {key: value for key, value in params.items() if value is not None}  # aiohttp no acepta None
+
+    def _parse_weather_response(self, city: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Estructura los datos relevantes de la respuesta de la API
+        """
+        return {
+            'city_name': city['name'],
+            'temperature': data['main']['temp'],
+            'feels_like': data['main']['feels_like'],
+            'humidity': data['main']['humidity'],
+            'pressure': data['main']['pressure'],
+            'wind_speed': data['wind']['speed'],
+            'description': data['weather'][0]['description'],
+            'timestamp': datetime.utcfromtimestamp(data['dt']),
+            'sunrise': datetime.utcfromtimestamp(data['sys']['sunrise']),
+            'sunset': datetime.utcfromtimestamp(data['sys']['sunset'])
+        }
+
+    def _cell_key(self, city: Dict[str, Any]) -> Tuple[float, float]:
+        """
+        Celda de grilla de una ciudad: las coordenadas redondeadas a grid_precision decimales
+        """
+        return round(city['lat'], self.grid_precision), round(city['lon'], self.grid_precision)
+
+    def _plan_requests(self, cities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Agrupa las ciudades en unidades de solicitud. Las ciudades que caen en la misma celda
+        comparten una respuesta y las que traen 'id' de OpenWeatherMap se piden en lotes
+        al endpoint 'group', que admite hasta 20 ids por llamada
+        """
+        cells, by_id = {}, {}
+        for city in cities:
+            if self.batch_size > 1 and 'id' in city:
+                by_id.setdefault(city['id'], []).append(city)
+            else:
+                cells.setdefault(self._cell_key(city), []).append(city)
+
+        units = [{'kind': 'coord', 'cities': group} for group in cells.values()]
+        ids = list(by_id)
+        for start in range(0, len(ids), self.batch_size):
+            chunk = ids[start:start + self.batch_size]
+            units.append({'kind': 'group', 'cities': [city for city_id in chunk for city in by_id[city_id]]})
+        return units
+
+    def _unit_request(self, unit: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Devuelve la URL y los parámetros de la solicitud de una unidad
+        """
+        if unit['kind'] == 'group':
+            ids = dict.fromkeys(str(city['id']) for city in unit['cities'])  # Sin repetidos, en orden
+            params = {'id': ','.join(ids), 'appid': self.api_key, 'units': 'metric'}
+            return f"{self.api_base}/group", {key: value for key, value in params.items() if value is not None}
+        lat, lon = self._cell_key(unit['cities'][0])  # Se consulta el centro de la celda
+        return f"{self.api_base}/weather", self._build_params({'lat': lat, 'lon': lon})
+
+    def _unit_payloads(self, unit: Dict[str, Any], data: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Reparte la respuesta de una unidad entre todas sus ciudades
+        """
+        if unit['kind'] == 'coord':
+            return [(city, data) for city in unit['cities']]
+        entries = {entry['id']: entry for entry in data['list']}
+        payloads = []
+        for city in unit['cities']:
+            if city['id'] in entries:
+                payloads.append((city, entries[city['id']]))
+            else:
+                logger.warning(f"No data returned for {city['name']} (id {city['id']})")
+        return payloads
+
+    @staticmethod
+    def _unit_label(unit: Dict[str, Any]) -> str:
+        return ', '.join(city['name'] for city in unit['cities'])
+
+    def _breaker_for(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.breaker_ratio, self.breaker_window, self.breaker_reset)
+            return self._breakers[host]
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """
+        Backoff exponencial con jitter completo: evita que los reintentos lleguen todos a la vez
+        """
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """
+        Solo se reintentan errores de red, timeouts, 5xx y 429; un 4xx no mejora al repetirlo
+        """
+        if isinstance(error, (ValueError, KeyError, TypeError)):
+            return False  # Respuesta 200 con un cuerpo inválido: el host responde, repetir no lo arregla
+        if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+            status = error.response.status_code
+        elif isinstance(error, aiohttp.ClientResponseError):
+            status = error.status
+        else:
+            return isinstance(error, (requests.exceptions.RequestException, aiohttp.ClientError, asyncio.TimeoutError))
+        return status >= 500 or status == 429
+
+    def _fetch_unit(self, unit: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Realiza un único intento de solicitud HTTP para todas las ciudades de la unidad
+        """
+        url, params = self._unit_request(unit)
+        breaker = self._breaker_for(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}")
+        with self.instrumentacion.medir('http', 'weather_api', host=urlparse(url).netloc) as medicion:
+            try:
+                # Realiza la solicitud GET reutilizando las conexiones de la sesión
+                response = self.session.get(url, params=params, timeout=self.request_timeout)
+                medicion['status'] = response.status_code
+                medicion['bytes'] = len(response.content)
+                response.raise_for_status()  # Verifica si hubo algún error en la respuesta
+
+            except requests.exceptions.RequestException as e:  # Si hay error en la solicitud
+                if self._is_retryable(e):
+                    breaker.record_failure()
+                logger.error(f"Error extracting data for {self._unit_label(unit)}: {str(e)}")  # Registra el error
+                raise  # Vuelve a lanzar la excepción
+            medicion['rows'] = len(unit['cities'])
+        return self._parse_unit(unit, breaker, response.content)
+
+    def _parse_unit(self, unit: Dict[str, Any], breaker: CircuitBreaker,
+                    body: bytes) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Decodifica la respuesta de una unidad. Un cuerpo que no es JSON o que no trae los
+        datos esperados cuenta como fallo en el circuit breaker, pero no se reintenta
+        """
         try:
-            response = requests.get(url, params=params, timeout=10)  # Realiza la solicitud GET
-            response.raise_for_status()  # Verifica si hubo algún error en la respuesta
-            data = response.json()  # Convierte la respuesta en formato JSON
-            
-            # Estructura los datos relevantes
-            weather_data = {
-                'city_name': city['name'],
-                'temperature': data['main']['temp'],
-                'feels_like': data['main']['feels_like'],
-                'humidity': data['main']['humidity'],
-                'pressure': data['main']['pressure'],
-                'wind_speed': data['wind']['speed'],
-                'description': data['weather'][0]['description'],
-                'timestamp': datetime.utcfromtimestamp(data['dt']),
-                'sunrise': datetime.utcfromtimestamp(data['sys']['sunrise']),
-                'sunset': datetime.utcfromtimestamp(data['sys']['sunset'])
-            }
-            return weather_data  # Devuelve los datos de la ciudad
-            
-        except requests.exceptions.RequestException as e:  # Si hay error en la solicitud
-            logger.error(f"Error extracting data for {city['name']}: {str(e)}")  # Registra el error
-            raise  # Vuelve a lanzar la excepción
+            payloads = self._unit_payloads(unit, json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            breaker.record_failure()
+            logger.error(f"Invalid response for {self._unit_label(unit)}: {e!r}")
+            raise
+        breaker.record_success()
+        return payloads
+
+    def _iter_threaded(self, units: Iterable[Dict[str, Any]]):
+        """
+        Planificador de reintentos con hilos: una unidad que falla vuelve a la cola con su
+        backoff y el hilo pasa a la siguiente en lugar de dormir. Nunca hay más de
+        2 * max_workers unidades enviadas a la vez. Produce (unidad, respuestas, error)
+        """
+        unit_iter = iter(units)
+        retry_queue = []  # heap de (listo_en, desempate, intento, unidad)
+        tiebreak = itertools.count()
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                while retry_queue and retry_queue[0][0] <= time.monotonic():
+                    _, _, attempt, unit = heapq.heappop(retry_queue)
+                    pending[executor.submit(en_contexto(self._fetch_unit), unit)] = (unit, attempt)
+                for unit in itertools.islice(unit_iter, max(0, 2 * self.max_workers - len(pending))):
+                    # Con el contexto actual, los bytes de cada solicitud van a la etapa que la lanzó
+                    pending[executor.submit(en_contexto(self._fetch_unit), unit)] = (unit, 1)
+                if not pending and not retry_queue:
+                    return
+                wait_for = max(0.0, retry_queue[0][0] - time.monotonic()) if retry_queue else None
+                if not pending:
+                    time.sleep(wait_for)
+                    continue
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit, attempt = pending.pop(future)
+                    try:
+                        payloads = future.result()
+                    except Exception as e:
+                        if attempt < self.max_attempts and self._is_retryable(e):
+                            ready_at = time.monotonic() + self._backoff_delay(attempt)
+                            heapq.heappush(retry_queue, (ready_at, next(tiebreak), attempt + 1, unit))
+                        else:
+                            yield unit, [], e
+                        continue
+                    yield unit, payloads, None
+
+    def extract_weather_data(self, city: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extrae datos meteorológicos de la API OpenWeatherMap para una ciudad
+        """
+        (_, payloads, error), = self._iter_threaded([{'kind': 'coord', 'cities': [city]}])
+        if error is not None:
+            raise error  # Vuelve a lanzar la excepción del último intento
+        return self._parse_weather_response(city, payloads[0][1])  # Devuelve los datos de la ciudad
+
+    async def _fetch_unit_async(self, session: aiohttp.ClientSession, unit: Dict[str, Any],
+                                semaphore: asyncio.Semaphore) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Versión asíncrona de _fetch_unit con sus reintentos: el semáforo limita las solicitudes
+        en vuelo y se libera durante el backoff
+        """
+        url, params = self._unit_request(unit)
+        breaker = self._breaker_for(url)
+        for attempt in itertools.count(1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}")
+            try:
+                async with semaphore:
+                    # Sin cpu_seconds: durante los await el hilo ejecuta otras solicitudes
+                    with self.instrumentacion.medir('http', 'weather_api', medir_cpu=False,
+                                                    host=urlparse(url).netloc) as medicion:
+                        async with session.get(url, params=params) as response:
+                            medicion['status'] = response.status
+                            body = await response.read()
+                            medicion['bytes'] = len(body)
+                            response.raise_for_status()
+                        medicion['rows'] = len(unit['cities'])
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = self._is_retryable(e)
+                if retryable:
+                    breaker.record_failure()
+                logger.error(f"Error extracting data for {self._unit_label(unit)}: {str(e)}")
+                if not retryable or attempt >= self.max_attempts:
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt))
+                continue
+            return self._parse_unit(unit, breaker, body)
+
+    async def _fetch_unit_guarded(self, session, unit, semaphore):
+        try:
+            return unit, await self._fetch_unit_async(session, unit, semaphore), None
+        except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError, ValueError, KeyError, TypeError) as e:
+            return unit, [], e
+
+    async def iter_payloads_async(self, units: Iterable[Dict[str, Any]]):
+        """
+        Generador asíncrono que produce (unidad, respuestas, error) a medida que terminan.
+        Mantiene como mucho 2 * max_concurrency tareas creadas a la vez
+        """
+        unit_iter = iter(units)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Un único conector para toda la ejecución: las conexiones keep-alive se reutilizan
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            pending = set()
+            try:
+                while True:
+                    for unit in itertools.islice(unit_iter, max(0, 2 * self.max_concurrency - len(pending))):
+                        pending.add(asyncio.create_task(self._fetch_unit_guarded(session, unit, semaphore)))
+                    if not pending:
+                        return
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            finally:
+                for task in pending:  # Si el consumidor se detiene o hay un error, cancela lo pendiente
+                    task.cancel()
+
+    def _iter_async(self, units: Iterable[Dict[str, Any]]):
+        """
+        Expone iter_payloads_async como un generador normal: el bucle de eventos corre en
+        otro hilo y entrega los resultados por una cola acotada, que frena la descarga si
+        el consumidor se atrasa
+        """
+        results = queue.Queue(maxsize=self.max_concurrency)
+        finished = object()
+        stop = threading.Event()
+
+        async def produce():
+            loop = asyncio.get_running_loop()
+            async for item in self.iter_payloads_async(units):
+                if stop.is_set():
+                    break
+                await loop.run_in_executor(None, results.put, item)  # Espera sin bloquear el bucle
+
+        def run():
+            try:
+                asyncio.run(produce())
+                results.put(finished)
+            except BaseException as e:
+                results.put(e)
+
+        # Las tareas de asyncio heredan el contexto del hilo, y con él la etapa en curso
+        producer = threading.Thread(target=en_contexto(run), daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = results.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            while producer.is_alive():  # Vacía la cola para que el productor pueda terminar
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def _iter_units(self, units: Iterable[Dict[str, Any]], mode: str):
+        """
+        Descarga las unidades con el modo indicado ('threaded' o 'async') y produce
+        (unidad, respuestas, error) a medida que terminan
+        """
+        if mode == 'async':
+            return self._iter_async(units)
+        if mode == 'threaded':
+            return self._iter_threaded(units)
+        raise ValueError(f"Unknown extraction mode: {mode}")
+
+    def _cache_key(self, city: Dict[str, Any]) -> Tuple[float, float, str]:
+        return (*self._cell_key(city), 'metric')
+
+    @staticmethod
+    def _payloads_to_columns(payloads: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, list]:
+        """
+        Estructura las respuestas por columnas. Las fechas quedan como segundos epoch
+        para no crear un objeto datetime por fila
+        """
+        columns = {field: [] for field in WEATHER_FIELDS}
+        for city, data in payloads:
+            columns['city_name'].append(city['name'])
+            columns['temperature'].append(data['main']['temp'])
+            columns['feels_like'].append(data['main']['feels_like'])
+            columns['humidity'].append(data['main']['humidity'])
+            columns['pressure'].append(data['main']['pressure'])
+            columns['wind_speed'].append(data['wind']['speed'])
+            columns['description'].append(data['weather'][0]['description'])
+            columns['timestamp'].append(data['dt'])
+            columns['sunrise'].append(data['sys']['sunrise'])
+            columns['sunset'].append(data['sys']['sunset'])
+        return columns
+
+    def iter_weather_payloads(self, cities: List[Dict[str, Any]] = None, mode: str = None):
+        """
+        Generador de (ciudad, respuesta) a medida que llegan, haciendo una solicitud por
+        unidad (celda o lote). Las ciudades con una respuesta vigente en la caché no se
+        vuelven a pedir y salen primero
+        """
+        cities = self.cities if cities is None else cities
+        missing, yielded, failed = [], 0, []
+        for city in cities:
+            data = self.cache.get(self._cache_key(city)) if self.cache else None
+            if data is None:
+                missing.append(city)
+            else:
+                yielded += 1
+                yield city, data
+
+        units = self._plan_requests(missing)
+        for unit, payloads, error in self._iter_units(units, mode or self.extraction_mode):
+            if error is not None:
+                failed.append((unit, error))
+                continue
+            for city, data in payloads:
+                if self.cache:
+                    self.cache.put(self._cache_key(city), data)
+                yielded += 1
+                yield city, data
+        if self.cache:
+            self.cache.flush()
+        self.failed_cities = [city for unit, _ in failed for city in unit['cities']]
+
+        # Registra cuántas idas y vueltas a la API se ahorraron con la caché, la deduplicación y los lotes
+        self.last_run_stats = {
+            'cities': len(cities),
+            'cache_hits': len(cities) - len(missing),
+            'round_trips': len(units),
+            'round_trips_saved': len(cities) - len(units),
+            'failed': len(self.failed_cities)
+        }
+        logger.info(f"Extraction used {len(units)} requests for {len(cities)} cities "
+                    f"({len(cities) - len(missing)} cache hits, {len(cities) - len(units)} round trips saved)")
+        if self.cache:
+            logger.info(f"Response cache: {self.cache.stats}")
+        if self.failed_cities:
+            # Una ciudad que falla ya no detiene la ejecución: se cargan las demás
+            logger.warning(f"Could not extract {len(self.failed_cities)} cities: {failed[-1][1]}")
+            if not yielded:
+                raise RuntimeError(f"No weather data could be extracted: {failed[-1][1]}")
 
-    def transform_weather_data(self, data: List[Dict[str, Any]]) -> pd.DataFrame:
+    @medir_etapa('extract')
+    def extract_all(self, cities: List[Dict[str, Any]] = None, mode: str = None, columnar: bool = False):
         """
-        Transforma los datos meteorológicos en un DataFrame de pandas
+        Extrae los datos de todas las ciudades de una vez. Con columnar=True devuelve un
+        diccionario de columnas en lugar de una lista de registros
+        """
+        payloads = list(self.iter_weather_payloads(cities, mode))
+        if columnar:
+            return self._payloads_to_columns(payloads)
+        return [self._parse_weather_response(city, data) for city, data in payloads]
+
+    @medir_etapa('transform')
+    def transform_weather_data(self, data) -> pd.DataFrame:
+        """
+        Transforma los datos meteorológicos en un DataFrame de pandas. Acepta la lista de
+        registros de extract_weather_data o el diccionario de columnas de extract_all(columnar=True)
         """
         try:
+            if isinstance(data, dict):
+                return self._transform_columns(data)
+
             df = pd.DataFrame(data)  # Convierte la lista de diccionarios en DataFrame
             
             # Cálculos adicionales
@@ -99,42 +707,197 @@ class WeatherDataETL:
             logger.error(f"Error transforming weather data: {str(e)}")
             raise  # Vuelve a lanzar la excepción
 
-    def load_to_postgres(self, df: pd.DataFrame) -> None:
+    def _transform_columns(self, columns: Dict[str, Any]) -> pd.DataFrame:
         """
-        Carga los datos transformados en la base de datos PostgreSQL
+        Transformación columnar: cada columna se convierte una vez a un arreglo tipado y
+        los cálculos se hacen sobre esos arreglos antes de armar el DataFrame
         """
-        try:
-            # Crea una conexión a la base de datos usando SQLAlchemy
-            engine = create_engine(
+        temperature = np.asarray(columns['temperature'], dtype='float64')
+        sunrise = np.asarray(columns['sunrise'], dtype='int64')
+        sunset = np.asarray(columns['sunset'], dtype='int64')
+
+        # Categoría de temperatura: mismos intervalos (a, b] que pd.cut, sin recalcular las categorías
+        category_codes = np.searchsorted(TEMP_CATEGORY_EDGES, temperature, side='left')
+        category_codes[np.isnan(temperature)] = -1
+
+        # Descripción: title() una vez por valor distinto; el código -1 (nulo) apunta al NaN final
+        description_codes, descriptions = pd.factorize(np.asarray(columns['description'], dtype=object))
+        titled = np.append(pd.Index(descriptions).str.title().to_numpy(dtype=object), np.nan)
+
+        return pd.DataFrame({
+            'city_name': np.asarray(columns['city_name'], dtype=object),
+            'temperature': temperature,
+            'feels_like': np.asarray(columns['feels_like'], dtype='float64'),
+            'humidity': np.asarray(columns['humidity'], dtype='int64'),
+            'pressure': np.asarray(columns['pressure'], dtype='int64'),
+            'wind_speed': np.asarray(columns['wind_speed'], dtype='float64'),
+            'description': titled.take(description_codes),
+            # unit='s' da datetime64[s]; la ruta de registros da [us] y ambas deben tener el mismo esquema
+            'timestamp': pd.to_datetime(np.asarray(columns['timestamp'], dtype='int64'), unit='s').astype('datetime64[us]'),
+            'sunrise': pd.to_datetime(sunrise, unit='s').astype('datetime64[us]'),
+            'sunset': pd.to_datetime(sunset, unit='s').astype('datetime64[us]'),
+            'day_length': (sunset - sunrise) / 3600,  # Duración del día en horas
+            'is_night': int(time.time()) > sunset,  # Verifica si es de noche
+            'temp_category': pd.Categorical.from_codes(category_codes, dtype=TEMP_CATEGORY_DTYPE)
+        })
+
+    def _get_engine(self):
+        """
+        Crea el engine de SQLAlchemy una sola vez y lo reutiliza durante toda la ejecución
+        """
+        if self._engine is None:
+            self._engine = create_engine(
                 f"postgresql://{self.db_params['user']}:{self.db_params['password']}@"
-                f"{self.db_params['host']}:{self.db_params['port']}/{self.db_params['database']}"
+                f"{self.db_params['host']}:{self.db_params['port']}/{self.db_params['database']}",
+                pool_pre_ping=True  # Descarta conexiones del pool que el servidor cerró
             )
-            
-            # Crea la tabla si no existe
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS weather_data (
-                id SERIAL PRIMARY KEY,
-                city_name VARCHAR(100),
-                temperature FLOAT,
-                feels_like FLOAT,
-                humidity INTEGER,
-                pressure INTEGER,
-                wind_speed FLOAT,
-                description VARCHAR(200),
-                timestamp TIMESTAMP,
-                sunrise TIMESTAMP,
-                sunset TIMESTAMP,
-                day_length FLOAT,
-                is_night BOOLEAN,
-                temp_category VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """
-            with engine.connect() as connection:
-                connection.execute(create_table_query)  # Ejecuta la creación de la tabla
-            
-            # Inserta los datos en la base de datos
-            df.to_sql('weather_data', engine, if_exists='append', index=False)
+        return self._engine
+
+    def _ensure_table(self, table_name: str) -> None:
+        """
+        Ejecuta el CREATE TABLE IF NOT EXISTS solo la primera vez que se usa la tabla
+        """
+        if table_name in self._ready_tables:
+            return
+        with self._get_engine().begin() as connection:
+            connection.execute(text(CREATE_TABLE_SQL.format(table=table_name)))  # Ejecuta la creación de la tabla
+        self._ready_tables.add(table_name)
+
+    def _copy_dataframe(self, cursor, df: pd.DataFrame, table_name: str) -> None:
+        """
+        Envía el DataFrame con COPY FROM STDIN en bloques CSV de copy_chunk_rows filas,
+        así el texto CSV nunca ocupa más que un bloque en memoria
+        """
+        copy_sql = f"COPY {table_name} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)"
+        for start in range(0, len(df), self.copy_chunk_rows):
+            buffer = io.StringIO()
+            df.iloc[start:start + self.copy_chunk_rows].to_csv(buffer, index=False, header=False)
+            self.instrumentacion.sumar_bytes(buffer.tell())
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+
+    def _ensure_unique_index(self, table_name: str) -> None:
+        """
+        Crea el índice único (city_name, timestamp) que usa el modo upsert. Si la tabla ya
+        tenía observaciones repetidas de ejecuciones anteriores, conserva la más antigua
+        """
+        if (table_name, 'unique') in self._ready_tables:
+            return
+        index_name = f"{table_name}_city_timestamp_key"
+        with self._get_engine().begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() "
+                     "AND tablename = :table AND indexname = :index"),
+                {'table': table_name, 'index': index_name}
+            ).scalar()
+            if not exists:
+                connection.execute(text(
+                    f"DELETE FROM {table_name} a USING {table_name} b "
+                    f"WHERE a.city_name = b.city_name AND a.timestamp = b.timestamp AND a.id > b.id"
+                ))
+                connection.execute(text(f"CREATE UNIQUE INDEX {index_name} ON {table_name} (city_name, timestamp)"))
+        self._ready_tables.add((table_name, 'unique'))
+
+    def _new_rows(self, df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        """
+        Filtra con la marca de agua (último timestamp cargado de cada ciudad) las filas que ya están en la tabla.
+        Una observación más antigua que la marca de agua se descarta aunque no esté en la tabla (un
+        relleno de datos atrasados): para cargarla, WEATHER_UPSERT_WATERMARK=0
+        """
+        with self._get_engine().connect() as connection:
+            rows = connection.execute(
+                text(f"SELECT city_name, MAX(timestamp) FROM {table_name} "
+                     f"WHERE city_name = ANY(:cities) GROUP BY city_name"),
+                {'cities': df['city_name'].unique().tolist()}
+            ).fetchall()
+        watermarks = pd.Series(dict(rows), dtype='datetime64[ns]')
+        last_loaded = df['city_name'].map(watermarks)
+        if self.on_conflict == 'update':
+            is_new = df['timestamp'] >= last_loaded  # La última observación puede venir corregida
+        else:
+            is_new = df['timestamp'] > last_loaded
+        return df[last_loaded.isna() | is_new]
+
+    def _upsert_dataframe(self, df: pd.DataFrame, table_name: str) -> int:
+        """
+        Copia las filas a una tabla temporal y las combina con INSERT ... ON CONFLICT.
+        Devuelve cuántas filas se insertaron o actualizaron
+        """
+        stage_name = f"{table_name}_stage"
+        columns = ', '.join(df.columns)
+        if self.on_conflict == 'update':
+            updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in df.columns
+                                if column not in ('city_name', 'timestamp'))
+            conflict_action = f"DO UPDATE SET {updates}"
+        elif self.on_conflict == 'nothing':
+            conflict_action = "DO NOTHING"
+        else:
+            raise ValueError(f"Unknown on_conflict action: {self.on_conflict}")
+
+        connection = self._get_engine().raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE TEMP TABLE {stage_name} ON COMMIT DROP AS "
+                               f"SELECT {columns} FROM {table_name} WITH NO DATA")
+                self._copy_dataframe(cursor, df, stage_name)
+                # DISTINCT ON evita que una misma clave aparezca dos veces en el mismo INSERT; de las
+                # repetidas queda la última copiada (ctid crece con el orden de COPY en la tabla temporal)
+                cursor.execute(
+                    f"INSERT INTO {table_name} ({columns}) "
+                    f"SELECT DISTINCT ON (city_name, timestamp) {columns} FROM {stage_name} "
+                    f"ORDER BY city_name, timestamp, ctid DESC "
+                    f"ON CONFLICT (city_name, timestamp) {conflict_action}"
+                )
+                merged = cursor.rowcount
+            connection.commit()
+            return merged
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    @medir_etapa('load')
+    def load_to_postgres(self, df: pd.DataFrame, table_name: str = 'weather_data', method: str = None,
+                         mode: str = None) -> None:
+        """
+        Carga los datos transformados en la base de datos PostgreSQL
+        """
+        method = method or self.load_method
+        mode = mode or self.load_mode
+        try:
+            self._ensure_table(table_name)
+
+            if mode == 'upsert':
+                # Carga incremental: solo lo que supera la marca de agua, combinado por (city_name, timestamp)
+                self._ensure_unique_index(table_name)
+                new_rows = self._new_rows(df, table_name) if self.upsert_watermark else df
+                if new_rows.empty:
+                    logger.info("No new observations since the last load, skipping")
+                    return
+                merged = self._upsert_dataframe(new_rows, table_name)
+                logger.info(f"Merged {merged} of {len(df)} records into PostgreSQL")
+                return
+            if mode != 'append':
+                raise ValueError(f"Unknown load mode: {mode}")
+
+            if method == 'copy':
+                # COPY usa la conexión de psycopg2 directamente; todo el DataFrame va en una transacción
+                connection = self._get_engine().raw_connection()
+                try:
+                    with connection.cursor() as cursor:
+                        self._copy_dataframe(cursor, df, table_name)
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    connection.close()  # Devuelve la conexión al pool
+            elif method == 'insert':
+                # Inserta los datos en la base de datos fila a fila
+                df.to_sql(table_name, self._get_engine(), if_exists='append', index=False)
+            else:
+                raise ValueError(f"Unknown load method: {method}")
             logger.info(f"Successfully loaded {len(df)} records to PostgreSQL")  # Registra éxito
             
         except Exception as e:  # En caso de error al cargar los datos
@@ -145,12 +908,13 @@ class WeatherDataETL:
         """
         Ejecuta el proceso ETL completo: extracción, transformación y carga
         """
+        if self.pipeline_mode == 'stream':
+            return self.run_etl_streaming()
         try:
             logger.info("Starting ETL process...")  # Registra inicio del proceso ETL
             
             # Realiza la extracción de datos de forma paralela para cada ciudad
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                weather_data = list(executor.map(self.extract_weather_data, self.cities))
+            weather_data = self.extract_all(columnar=self.transform_engine == 'columnar')
             
             transformed_data = self.transform_weather_data(weather_data)  # Transforma los datos
             self.load_to_postgres(transformed_data)  # Carga los datos transformados en la base de datos
@@ -160,8 +924,319 @@ class WeatherDataETL:
         except Exception as e:  # En caso de error en el proceso ETL
             logger.error(f"ETL process failed: {str(e)}")
             raise  # Vuelve a lanzar la excepción
+        finally:
+            self.instrumentacion.exportar()  # Exporta las métricas de la ejecución
+
+    def run_etl_streaming(self, cities: List[Dict[str, Any]] = None, batch_size: int = None) -> None:
+        """
+        Ejecuta el ETL en modo streaming: la extracción produce respuestas a medida que
+        llegan, se transforman en micro-lotes de batch_size ciudades y cada lote se carga
+        enseguida. La memoria depende del tamaño del lote y no del número de ciudades
+        """
+        batch_size = batch_size or self.stream_batch_size
+        try:
+            logger.info("Starting streaming ETL process...")
+            start = time.perf_counter()
+            # Solo el tiempo dentro de next() cuenta como extract; el resto queda en transform y load
+            payloads = self.instrumentacion.medir_iterable('extract', self.iter_weather_payloads(cities))
+            loaded = 0
+            while True:
+                batch = list(itertools.islice(payloads, batch_size))
+                if not batch:
+                    break
+                self.load_to_postgres(self.transform_weather_data(self._payloads_to_columns(batch)))
+                if not loaded:
+                    logger.info(f"First batch landed after {time.perf_counter() - start:.2f}s")
+                loaded += len(batch)
+            logger.info(f"Streaming ETL process completed successfully! {loaded} records "
+                        f"in {time.perf_counter() - start:.2f}s")
+
+        except Exception as e:
+            logger.error(f"ETL process failed: {str(e)}")
+            raise
+        finally:
+            self.instrumentacion.exportar()
+
+# -----------------------------------------------------
+# Servidor stub y benchmarks
+# -----------------------------------------------------
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """
+    Imita la API de OpenWeatherMap con respuestas fijas y una latencia configurable
+    """
+    protocol_version = 'HTTP/1.1'  # Necesario para mantener las conexiones keep-alive
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo salen en escrituras separadas
+    latency = 0.02  # Segundos de espera por solicitud para simular la red
+    failure_rate = 0.0  # Proporción de solicitudes que responden con failure_status
+    failure_status = 503
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:  # Inyección de fallos
+            self.send_response(self.failure_status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if url.path.endswith('/group'):
+            ids = [int(city_id) for city_id in query['id'][0].split(',')]
+            data = {'cnt': len(ids), 'list': [dict(_stub_payload(city_id % 90, city_id % 180), id=city_id)
+                                              for city_id in ids]}
+        else:
+            data = _stub_payload(float(query['lat'][0]), float(query['lon'][0]))
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # Silencia el log por solicitud
+        pass
+
+
+def _stub_payload(lat: float, lon: float) -> Dict[str, Any]:
+    now = int(time.time())
+    return {
+        'coord': {'lat': lat, 'lon': lon},
+        'main': {'temp': 15 + lat % 20, 'feels_like': 14.0, 'humidity': 60, 'pressure': 1013},
+        'wind': {'speed': 3.5},
+        'weather': [{'description': 'clear sky'}],
+        'dt': now - now % 600,
+        'sys': {'sunrise': now - 6 * 3600, 'sunset': now + 6 * 3600}
+    }
+
+
+class StubWeatherServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # El modo async abre hasta max_concurrency conexiones de golpe
+
+    def handle_error(self, request, client_address):  # Clientes que cortan por timeout no son errores aquí
+        pass
+
+
+def start_stub_server(handler=StubWeatherHandler):
+    """
+    Levanta el servidor stub en un puerto libre y devuelve (servidor, url_base)
+    """
+    server = StubWeatherServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/data/2.5"
+
+
+def synthetic_cities(n: int, with_ids: bool = False) -> List[Dict[str, Any]]:
+    """
+    Genera n ciudades con coordenadas distintas para los benchmarks
+    """
+    cities = [{'name': f'City {i}', 'lat': -60 + (i * 0.37) % 120, 'lon': -180 + (i * 0.53) % 360}
+              for i in range(n)]
+    if with_ids:
+        for i, city in enumerate(cities):
+            city['id'] = 1000 + i
+    return cities
+
+
+def benchmark_extraction(n_cities: int = 2000) -> None:
+    """
+    Compara ciudades/segundo de los modos threaded y async contra el servidor stub
+    """
+    server, base_url = start_stub_server()
+    try:
+        etl = WeatherDataETL()
+        etl.api_base = base_url
+        etl.cache = None  # Sin caché para medir la extracción real
+        scenarios = [('coordinates', synthetic_cities(n_cities)), ('city ids', synthetic_cities(n_cities, with_ids=True))]
+        for label, cities in scenarios:
+            for mode in ('threaded', 'async'):
+                start = time.perf_counter()
+                records = etl.extract_all(cities, mode=mode)
+                elapsed = time.perf_counter() - start
+                print(f"{label:>11} / {mode:>9}: {len(records)} cities in {elapsed:.2f}s "
+                      f"-> {len(records) / elapsed:.0f} cities/s, "
+                      f"{etl.last_run_stats['round_trips_saved']} round trips saved")
+
+        # Segunda ejecución con caché: las respuestas vigentes evitan la red
+        etl.cache = WeatherResponseCache()
+        cities = synthetic_cities(n_cities)
+        for run in ('cold', 'warm'):
+            start = time.perf_counter()
+            etl.extract_all(cities, mode='async')
+            elapsed = time.perf_counter() - start
+            print(f"{'cache ' + run:>23}: {len(cities) / elapsed:.0f} cities/s, stats {etl.cache.stats}")
+    finally:
+        server.shutdown()
+
+
+def benchmark_faults(n_cities: int = 200, max_flaky_failure_rate: float = 0.1) -> bool:
+    """
+    Mide cuánto tarda una ejecución con un proveedor inestable, caído o lento y verifica
+    que con el proveedor caído o lento el circuit breaker se abra y la ejecución termine
+    en menos de un décimo de lo que tardaba @retry, y que con el inestable fallen como
+    mucho max_flaky_failure_rate de las ciudades
+    Returns:
+        bool: True si se cumplen todas las verificaciones
+    """
+    # Con @retry(tries=3, delay=2, backoff=2) cada ciudad caída bloqueaba su hilo 2 + 4 segundos
+    old_retry_bound = n_cities / 4 * 6
+    scenarios = [
+        ('flaky (30% 503)', {'failure_rate': 0.3}, 10, False),
+        ('down (100% 503)', {'failure_rate': 1.0}, 10, True),
+        ('slow (2s latency)', {'latency': 2.0}, 0.5, True),
+    ]
+    ok = True
+    for label, handler_attrs, request_timeout, expect_open in scenarios:
+        handler = type('FaultyWeatherHandler', (StubWeatherHandler,), handler_attrs)
+        server, base_url = start_stub_server(handler)
+        try:
+            etl = WeatherDataETL()
+            etl.api_base = base_url
+            etl.cache = None
+            etl.request_timeout = request_timeout
+            etl.backoff_base = 0.2
+            start = time.perf_counter()
+            try:
+                etl.extract_all(synthetic_cities(n_cities), mode='threaded')
+            except RuntimeError:
+                pass  # Todas las ciudades fallaron: se mide igual el tiempo hasta rendirse
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+        opened = any(breaker.opened_at is not None for breaker in etl._breakers.values())
+        if expect_open:
+            checks = [(opened, 'circuit opened'),
+                      (elapsed < old_retry_bound / 10, f"under {old_retry_bound / 10:.0f}s")]
+        else:
+            checks = [(len(etl.failed_cities) <= max_flaky_failure_rate * n_cities,
+                       f"at most {max_flaky_failure_rate:.0%} failed")]
+        missed = [description for passed, description in checks if not passed]
+        ok = ok and not missed
+        print(f"{label:>18}: {elapsed:.2f}s, {len(etl.failed_cities)}/{n_cities} cities failed, circuit "
+              f"{'open' if opened else 'closed'} -> {'OK' if not missed else 'FAILED: ' + ', '.join(missed)}")
+    print(f"{'old @retry (down)':>18}: >= {old_retry_bound:.0f}s with 4 workers")
+    return ok
+
+
+def synthetic_weather_frame(n_rows: int) -> pd.DataFrame:
+    """
+    Genera un DataFrame ya transformado de n_rows filas para los benchmarks de carga
+    """
+    rng = np.random.default_rng(0)
+    timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(n_rows) // 1000 * 600, unit='s')
+    temperature = rng.uniform(-10, 40, n_rows).round(2)
+    return pd.DataFrame({
+        'city_name': [f'City {i}' for i in range(1000)] * (n_rows // 1000) + [f'City {i}' for i in range(n_rows % 1000)],
+        'temperature': temperature,
+        'feels_like': temperature - 1,
+        'humidity': rng.integers(10, 100, n_rows),
+        'pressure': rng.integers(980, 1040, n_rows),
+        'wind_speed': rng.uniform(0, 20, n_rows).round(2),
+        'description': 'Clear Sky',
+        'timestamp': timestamps,
+        'sunrise': timestamps - pd.Timedelta(hours=6),
+        'sunset': timestamps + pd.Timedelta(hours=6),
+        'day_length': 12.0,
+        'is_night': False,
+        'temp_category': pd.cut(temperature, bins=[-float('inf'), 10, 20, 30, float('inf')],
+                                labels=['Cold', 'Mild', 'Warm', 'Hot'])
+    })
+
+
+def synthetic_weather_columns(n_rows: int) -> Dict[str, np.ndarray]:
+    """
+    Genera columnas como las de extract_all(columnar=True) para los benchmarks de transformación
+    """
+    rng = np.random.default_rng(0)
+    now = int(time.time())
+    city_names = np.array([f'City {i}' for i in range(1000)], dtype=object)
+    descriptions = np.array(['clear sky', 'few clouds', 'light rain', 'overcast clouds', 'moderate rain'], dtype=object)
+    sunrise = now - rng.integers(0, 12 * 3600, n_rows)
+    return {
+        'city_name': city_names[np.arange(n_rows) % len(city_names)],
+        'temperature': rng.uniform(-10, 40, n_rows),
+        'feels_like': rng.uniform(-12, 38, n_rows),
+        'humidity': rng.integers(10, 100, n_rows),
+        'pressure': rng.integers(980, 1040, n_rows),
+        'wind_speed': rng.uniform(0, 20, n_rows),
+        'description': descriptions[rng.integers(0, len(descriptions), n_rows)],
+        'timestamp': np.full(n_rows, now - now % 600),
+        'sunrise': sunrise,
+        'sunset': sunrise + 12 * 3600
+    }
+
+
+def _transform_benchmark_worker(engine: str, n_rows: int) -> Tuple[float, int, int]:
+    """
+    Se ejecuta en un proceso nuevo: devuelve (segundos, pico RSS tras generar la entrada, pico RSS final) en KB
+    """
+    import resource
+    etl = WeatherDataETL()
+    data = synthetic_weather_columns(n_rows)
+    if engine == 'records':
+        # Misma entrada que produce extract_weather_data: un diccionario con datetimes por ciudad
+        data = [dict(zip(WEATHER_FIELDS, row[:7] + tuple(datetime.utcfromtimestamp(int(epoch)) for epoch in row[7:])))
+                for row in zip(*(data[field] for field in WEATHER_FIELDS))]
+    rss_input = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    etl.transform_weather_data(data)
+    elapsed = time.perf_counter() - start
+    return elapsed, rss_input, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark_transform(sizes=(10_000, 1_000_000, 10_000_000), records_limit: int = 1_000_000) -> None:
+    """
+    Compara tiempo y pico de memoria de las transformaciones por registros y columnar.
+    La entrada por registros de 10M filas ocupa decenas de GB, por eso se limita a records_limit
+    """
+    context = multiprocessing.get_context('spawn')  # Un proceso limpio por medición
+    for n_rows in sizes:
+        for engine in ('records', 'columnar'):
+            if engine == 'records' and n_rows > records_limit:
+                print(f"{n_rows:>10} rows / {engine:>8}: skipped (input too large)")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                elapsed, rss_input, rss_peak = executor.submit(_transform_benchmark_worker, engine, n_rows).result()
+            print(f"{n_rows:>10} rows / {engine:>8}: {elapsed:.2f}s, "
+                  f"peak RSS {rss_peak / 1024:.0f} MB (+{(rss_peak - rss_input) / 1024:.0f} MB over input)")
+
+
+def benchmark_load(n_rows: int = 1_000_000) -> None:
+    """
+    Compara filas/segundo de la carga con COPY y con to_sql sobre una tabla temporal de benchmark
+    """
+    etl = WeatherDataETL()
+    df = synthetic_weather_frame(n_rows)
+    table_name = 'weather_data_bench'
+    try:
+        for method in ('copy', 'insert'):
+            start = time.perf_counter()
+            etl.load_to_postgres(df, table_name=table_name, method=method)
+            elapsed = time.perf_counter() - start
+            print(f"{method:>6}: {n_rows} rows in {elapsed:.2f}s -> {n_rows / elapsed:.0f} rows/s")
+    finally:
+        with etl._get_engine().begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+
 
 # Ejecuta el script si se ejecuta directamente
 if __name__ == "__main__":
-    etl = WeatherDataETL()  # Crea una instancia de la clase WeatherDataETL
-    etl.run_etl()  # Ejecuta el proceso ETL
+    parser = argparse.ArgumentParser(description='ETL de datos meteorológicos')
+    parser.add_argument('--benchmark', nargs='?', const='extraction', choices=['extraction', 'faults', 'transform', 'load'],
+                        help='Ejecuta un benchmark (extracción contra un servidor stub local, transformación '
+                             'o carga en PostgreSQL); sin valor, el de extracción')
+    parser.add_argument('--cities', type=int, default=2000, help='Número de ciudades sintéticas del benchmark')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Número de filas del benchmark de carga')
+    args = parser.parse_args()
+
+    if args.benchmark == 'extraction':
+        benchmark_extraction(args.cities)
+    elif args.benchmark == 'faults':
+        sys.exit(0 if benchmark_faults(args.cities) else 1)
+    elif args.benchmark == 'transform':
+        benchmark_transform()
+    elif args.benchmark == 'load':
+        benchmark_load(args.rows)
+    else:
+        etl = WeatherDataETL()  # Crea una instancia de la clase WeatherDataETL
+        etl.run_etl()  # Ejecuta el proceso ETL
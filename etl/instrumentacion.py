@@ -0,0 +1,279 @@
+# -----------------------------------------------------
+# Instrumentación de los pipelines ETL
+# -----------------------------------------------------
+# Registra tiempo real, tiempo de CPU, filas, bytes y pico de memoria de cada
+# etapa (extract, transform, load) y de cada llamada HTTP. Parte de la misma idea
+# que el decorador medir_tiempo de herramientas-adicionales/herramientas.py, pero
+# guarda las mediciones para exportarlas como JSON lines o en formato de texto
+# de Prometheus (apto para el textfile collector de node_exporter).
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# (instrumentación, medición) de la etapa en curso. Es una variable de contexto y no un
+# atributo: cada hilo y cada tarea de asyncio ve su propia etapa, así los bytes de un hilo
+# no se suman a la etapa que otro hilo tenga activa en ese momento
+_ETAPA = contextvars.ContextVar('etapa', default=None)
+
+
+def _pico_rss_bytes() -> int:
+    """
+    Pico de memoria residente del proceso hasta ahora, en bytes (0 donde no hay
+    módulo resource, como en Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == 'darwin' else pico * 1024  # Bytes en macOS, KB en Linux
+
+
+class Instrumentacion:
+    """Acumula las mediciones de un pipeline y las exporta al terminar."""
+    def __init__(self, pipeline: str, ruta: Optional[str] = None, formato: Optional[str] = None):
+        """
+        Args:
+            pipeline: Nombre del pipeline, se agrega como etiqueta a cada medición
+            ruta: Archivo de salida (por defecto ETL_METRICS_PATH; sin ruta no se exporta)
+            formato: 'jsonl' o 'prometheus' (por defecto ETL_METRICS_FORMAT o 'jsonl')
+        """
+        self.pipeline = pipeline
+        self.ruta = ruta or os.getenv('ETL_METRICS_PATH')
+        self.formato = formato or os.getenv('ETL_METRICS_FORMAT', 'jsonl')
+        self.mediciones = []
+        self._lock = threading.Lock()  # Las llamadas HTTP se miden desde varios hilos
+
+    @contextmanager
+    def medir(self, tipo: str, nombre: str, *, medir_cpu: bool = True, **etiquetas: Any):
+        """
+        Mide el bloque with. El bloque puede completar 'rows' y 'bytes' en el
+        diccionario que recibe.
+        Args:
+            tipo: 'stage' para etapas o 'http' para llamadas HTTP
+            nombre: Nombre de la etapa o del servicio llamado
+            medir_cpu: False omite cpu_seconds; para bloques que esperan con await, donde
+                el hilo corre otras corrutinas y su tiempo de CPU no es del bloque
+            etiquetas: Datos extra de la medición (host, status, ...)
+        """
+        medicion = self._nueva_medicion(tipo, nombre, **etiquetas)
+        # Una llamada HTTP corre en un solo hilo; una etapa puede repartirse entre varios
+        reloj_cpu = time.thread_time if tipo == 'http' else time.process_time
+        if tipo == 'stage':
+            token = _ETAPA.set((self, medicion))
+        inicio, inicio_cpu = time.perf_counter(), reloj_cpu()
+        try:
+            yield medicion
+        except Exception:
+            medicion['error'] = True
+            raise
+        finally:
+            if tipo == 'stage':
+                _ETAPA.reset(token)
+            else:
+                self.sumar_bytes(medicion['bytes'])
+            # Sin el tiempo que pasó dentro de una etapa medida con medir_iterable o en pausa
+            medicion['wall_seconds'] = time.perf_counter() - inicio - medicion.pop('_pausa_wall')
+            pausa_cpu = medicion.pop('_pausa_cpu')
+            if medir_cpu:
+                medicion['cpu_seconds'] = reloj_cpu() - inicio_cpu - pausa_cpu
+            self._registrar(medicion)
+
+    @contextmanager
+    def pausa(self, medicion: Dict[str, Any]):
+        """
+        Descuenta de una medición abierta con medir el tiempo del bloque. Sirve para el
+        yield de un generador medido: mientras el consumidor procesa el elemento, el
+        generador está detenido y ese tiempo no es suyo.
+        """
+        reloj_cpu = time.thread_time if medicion['kind'] == 'http' else time.process_time
+        inicio, inicio_cpu = time.perf_counter(), reloj_cpu()
+        try:
+            yield
+        finally:
+            medicion['_pausa_wall'] += time.perf_counter() - inicio
+            medicion['_pausa_cpu'] += reloj_cpu() - inicio_cpu
+
+    def medir_iterable(self, nombre: str, iterable: Iterable) -> Iterator:
+        """
+        Mide una etapa que produce sus resultados de a uno (como extract, consumido por
+        transform). Cuenta cada elemento como una fila y solo el tiempo que pasa dentro
+        de next(): lo que hace el consumidor queda en su propia etapa, y el tiempo de
+        next() se descuenta de la etapa que está consumiendo, así las etapas no se
+        cuentan dos veces.
+        """
+        medicion = self._nueva_medicion('stage', nombre)
+        medicion['wall_seconds'] = medicion['cpu_seconds'] = 0.0
+        iterador = iter(iterable)
+        try:
+            while True:
+                # Los bytes de las llamadas HTTP dentro de next() van a esta etapa
+                consumidora = self._etapa_actual()
+                token = _ETAPA.set((self, medicion))
+                inicio, inicio_cpu = time.perf_counter(), time.process_time()
+                try:
+                    elemento = next(iterador)
+                except StopIteration:
+                    break
+                finally:
+                    _ETAPA.reset(token)
+                    transcurrido, cpu = time.perf_counter() - inicio, time.process_time() - inicio_cpu
+                    medicion['wall_seconds'] += transcurrido
+                    medicion['cpu_seconds'] += cpu
+                    if consumidora is not None:
+                        consumidora['_pausa_wall'] += transcurrido
+                        consumidora['_pausa_cpu'] += cpu
+                medicion['rows'] += 1
+                yield elemento
+        except Exception:
+            medicion['error'] = True
+            raise
+        finally:
+            del medicion['_pausa_wall'], medicion['_pausa_cpu']
+            self._registrar(medicion)
+
+    def _nueva_medicion(self, tipo: str, nombre: str, **etiquetas: Any) -> Dict[str, Any]:
+        # _pausa_*: tiempo dentro de etapas medidas con medir_iterable o en pausa, se descuenta al terminar
+        return {'pipeline': self.pipeline, 'kind': tipo, 'name': nombre, **etiquetas,
+                'rows': 0, 'bytes': 0, 'error': False, '_pausa_wall': 0.0, '_pausa_cpu': 0.0}
+
+    def _registrar(self, medicion: Dict[str, Any]) -> None:
+        medicion['peak_rss_bytes'] = _pico_rss_bytes()
+        medicion['timestamp'] = time.time()
+        with self._lock:
+            self.mediciones.append(medicion)
+
+    def _etapa_actual(self) -> Optional[Dict[str, Any]]:
+        # Solo las etapas de esta instrumentación; otro pipeline puede tener la suya activa
+        actual = _ETAPA.get()
+        return actual[1] if actual is not None and actual[0] is self else None
+
+    def sumar_bytes(self, cantidad: int) -> None:
+        """
+        Suma bytes transferidos a la etapa en curso en este contexto (en modo streaming
+        las etapas se intercalan y los bytes van a la que esté activa)
+        """
+        etapa = self._etapa_actual()
+        if etapa is not None:
+            with self._lock:
+                etapa['bytes'] += cantidad
+
+    def resumen(self) -> Dict[tuple, Dict[str, float]]:
+        """
+        Agrega las mediciones por (tipo, nombre, host)
+        """
+        agregado = {}
+        with self._lock:
+            mediciones = list(self.mediciones)
+        for medicion in mediciones:
+            clave = (medicion['kind'], medicion['name'], medicion.get('host', ''))
+            total = agregado.setdefault(clave, {'count': 0, 'errors': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                'rows': 0, 'bytes': 0, 'peak_rss_bytes': 0})
+            total['count'] += 1
+            total['errors'] += medicion['error']
+            for campo in ('wall_seconds', 'cpu_seconds', 'rows', 'bytes'):
+                total[campo] += medicion.get(campo, 0)
+            total['peak_rss_bytes'] = max(total['peak_rss_bytes'], medicion['peak_rss_bytes'])
+        return agregado
+
+    def exportar(self, ruta: Optional[str] = None, formato: Optional[str] = None) -> None:
+        """
+        Escribe las mediciones en la ruta configurada; sin ruta no hace nada
+        """
+        ruta = ruta or self.ruta
+        formato = formato or self.formato
+        if not ruta:
+            return
+        if formato == 'jsonl':
+            self._exportar_jsonl(ruta)
+        elif formato == 'prometheus':
+            self._exportar_prometheus(ruta)
+        else:
+            raise ValueError(f"Formato de métricas desconocido: {formato}")
+
+    def _exportar_jsonl(self, ruta: str) -> None:
+        # Una línea JSON por medición; se agrega al final para acumular varias ejecuciones
+        with self._lock:
+            mediciones, self.mediciones = self.mediciones, []
+        with open(ruta, 'a') as archivo:
+            for medicion in mediciones:
+                archivo.write(json.dumps(medicion) + '\n')
+
+    def _exportar_prometheus(self, ruta: str) -> None:
+        lineas = []
+        metricas = [
+            ('wall_seconds', 'duration_seconds_total', 'Tiempo real acumulado'),
+            ('cpu_seconds', 'cpu_seconds_total', 'Tiempo de CPU acumulado'),
+            ('rows', 'rows_total', 'Filas procesadas'),
+            ('bytes', 'bytes_total', 'Bytes transferidos'),
+            ('count', 'calls_total', 'Número de mediciones'),
+            ('errors', 'errors_total', 'Mediciones que terminaron con error'),
+            ('peak_rss_bytes', 'peak_rss_bytes', 'Pico de memoria residente del proceso'),
+        ]
+        resumen = self.resumen()
+        for campo, sufijo, ayuda in metricas:
+            for tipo in ('stage', 'http'):
+                nombre_metrica = f"etl_{tipo}_{sufijo}"
+                filas = [(clave, total) for clave, total in resumen.items() if clave[0] == tipo]
+                if not filas:
+                    continue
+                lineas.append(f"# HELP {nombre_metrica} {ayuda}")
+                lineas.append(f"# TYPE {nombre_metrica} {'gauge' if campo == 'peak_rss_bytes' else 'counter'}")
+                for (_, nombre, host), total in filas:
+                    etiquetas = f'pipeline="{self.pipeline}",name="{nombre}"'
+                    if host:
+                        etiquetas += f',host="{host}"'
+                    lineas.append(f"{nombre_metrica}{{{etiquetas}}} {total[campo]}")
+        # Escritura atómica: el collector nunca lee un archivo a medio escribir
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w') as archivo:
+            archivo.write('\n'.join(lineas) + '\n')
+        os.replace(temporal, ruta)
+
+
+def en_contexto(funcion: Callable) -> Callable:
+    """
+    Envuelve funcion para que corra con el contexto de quien la envuelve, etapa en curso
+    incluida. Los hilos nuevos y los de un ThreadPoolExecutor empiezan con un contexto
+    vacío; sin esto los bytes de sus llamadas HTTP no se suman a ninguna etapa.
+    """
+    contexto = contextvars.copy_context()
+
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        # Una copia por llamada: un mismo contexto no puede estar activo en dos hilos
+        return contexto.copy().run(funcion, *args, **kwargs)
+    return envoltura
+
+
+def medir_etapa(nombre: str):
+    """
+    Decorador para métodos de un pipeline con atributo 'instrumentacion'.
+    Cuenta como filas el largo del resultado (de una de sus columnas si es un
+    diccionario de columnas) o, si no tiene, el del primer argumento (por ejemplo,
+    el DataFrame que recibe load).
+    """
+    def decorador(func):
+        @wraps(func)
+        def envoltura(self, *args, **kwargs):
+            instrumentacion = getattr(self, 'instrumentacion', None)
+            if instrumentacion is None:
+                return func(self, *args, **kwargs)
+            with instrumentacion.medir('stage', nombre) as medicion:
+                resultado = func(self, *args, **kwargs)
+                if isinstance(resultado, dict):
+                    medicion['rows'] = len(next(iter(resultado.values()), ()))
+                elif hasattr(resultado, '__len__'):
+                    medicion['rows'] = len(resultado)
+                elif args and hasattr(args[0], '__len__'):
+                    medicion['rows'] = len(args[0])
+                return resultado
+        return envoltura
+    return decorador
@@ -0,0 +1,184 @@
+# -----------------------------------------------------
+# Transformación de CSV de productos por bloques
+# -----------------------------------------------------
+# Versión reutilizable del Ejemplo 1 de etl-ejemplo.py para catálogos que no entran
+# en memoria: lee el CSV por bloques de filas con tipos explícitos, transforma cada
+# bloque con operaciones vectorizadas y lo agrega al archivo de salida. La memoria
+# depende del tamaño del bloque y no del archivo. La salida puede ser CSV o, con
+# --formato, Parquet o Arrow IPC (ver destinos.py).
+#
+# Uso:
+#   python productos_csv.py productos.csv productos_transformados.csv --chunksize 200000 --procesos 4
+#   python productos_csv.py productos.csv productos.parquet --formato parquet --particiones categoria
+#   python productos_csv.py --benchmark 5000000
+
+import argparse
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from destinos import DestinoCSV, crear_destino
+
+TASA_IVA = 1.21
+# Tipos conocidos del catálogo; sin ellos pandas infiere cada bloque por separado y un
+# bloque puede salir con otro tipo que el anterior. Se completan con --dtype
+DTYPES_PRODUCTOS = {'nombre': 'string', 'categoria': 'string', 'precio': 'float64'}
+
+
+def transformar_bloque(bloque: pd.DataFrame, tasa_iva: float = TASA_IVA) -> pd.DataFrame:
+    """
+    Transforma un bloque: agrega el precio con IVA y renombra 'nombre' a 'producto'.
+    """
+    bloque['precio_con_iva'] = bloque['precio'] * tasa_iva
+    return bloque.rename(columns={'nombre': 'producto'})
+
+
+def _bloque_a_csv(bloque: pd.DataFrame, tasa_iva: float, encabezado: bool) -> Tuple[str, int]:
+    # Corre en los procesos trabajadores: transforma y da formato, que es lo más costoso
+    return transformar_bloque(bloque, tasa_iva).to_csv(index=False, header=encabezado), len(bloque)
+
+
+def _bloque_transformado(bloque: pd.DataFrame, tasa_iva: float, encabezado: bool) -> pd.DataFrame:
+    return transformar_bloque(bloque, tasa_iva)
+
+
+def _bloques_en_paralelo(lector: Iterator[pd.DataFrame], funcion, tasa_iva: float, procesos: int) -> Iterator:
+    """
+    Aplica funcion a los bloques en un pool de procesos y devuelve los resultados en
+    orden. Como mucho hay 2 * procesos bloques en vuelo, así que la memoria sigue
+    acotada aunque la escritura sea más lenta que la lectura.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        en_vuelo = deque()
+        for numero, bloque in enumerate(lector):
+            en_vuelo.append(executor.submit(funcion, bloque, tasa_iva, numero == 0))
+            if len(en_vuelo) >= 2 * procesos:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+def transformar_csv(entrada: str, salida: str, chunksize: int = 100_000,
+                    dtype: Optional[Dict[str, str]] = None, procesos: int = 1,
+                    tasa_iva: float = TASA_IVA, formato: str = 'csv',
+                    particiones: Sequence[str] = ()) -> int:
+    """
+    Transforma un CSV de productos bloque a bloque.
+    Args:
+        entrada: CSV de origen (puede estar comprimido; pandas lo detecta por la extensión)
+        salida: Archivo (o carpeta, si hay particiones) de destino; se escribe en un
+            temporal que reemplaza al destino al final
+        chunksize: Filas por bloque
+        dtype: Tipos de columnas que se suman a DTYPES_PRODUCTOS
+        procesos: Con más de uno, los bloques se transforman en un pool de procesos
+        tasa_iva: Multiplicador para precio_con_iva
+        formato: 'csv', 'parquet' o 'ipc'
+        particiones: Columnas de partición para 'parquet' e 'ipc'
+    Returns:
+        int: Filas escritas
+    """
+    tipos = {**DTYPES_PRODUCTOS, **(dtype or {})}
+    opciones = {'particiones': particiones} if particiones else {}
+    with pd.read_csv(entrada, chunksize=chunksize, dtype=tipos) as lector, \
+            crear_destino(formato, salida, **opciones) as destino:
+        if procesos > 1 and isinstance(destino, DestinoCSV):
+            # En CSV los trabajadores también dan formato al texto
+            for texto, filas in _bloques_en_paralelo(lector, _bloque_a_csv, tasa_iva, procesos):
+                destino.escribir_texto(texto, filas)
+        elif procesos > 1:
+            for bloque in _bloques_en_paralelo(lector, _bloque_transformado, tasa_iva, procesos):
+                destino.escribir(bloque)
+        else:
+            for bloque in lector:
+                destino.escribir(transformar_bloque(bloque, tasa_iva))
+    return destino.filas
+
+
+# -----------------------------------------------------
+# Benchmark
+# -----------------------------------------------------
+
+def generar_productos(ruta: str, filas: int, bloque: int = 1_000_000) -> None:
+    """
+    Escribe un CSV de productos sintético con filas productos.
+    """
+    import numpy as np
+    rng = np.random.default_rng(0)
+    with open(ruta, 'w', newline='') as archivo:
+        for inicio in range(0, filas, bloque):
+            ids = np.arange(inicio, min(inicio + bloque, filas))
+            pd.DataFrame({
+                'id': ids,
+                'nombre': 'Producto ' + pd.Series(ids).astype(str),
+                'categoria': pd.Series(rng.choice(['hogar', 'electrónica', 'jardín', 'juguetes'], len(ids))),
+                'precio': rng.uniform(1, 1000, len(ids)).round(2),
+                'stock': rng.integers(0, 500, len(ids)),
+            }).to_csv(archivo, index=False, header=inicio == 0)
+
+
+def _medir_variante(variante: str, entrada: str, salida: str):
+    """
+    Se ejecuta en un proceso nuevo: devuelve (segundos, pico RSS en KB).
+    """
+    import resource
+    inicio = time.perf_counter()
+    if variante == 'completo':
+        # El Ejemplo 1 original: todo el archivo en memoria
+        data = pd.read_csv(entrada)
+        transformar_bloque(data).to_csv(salida, index=False)
+    elif variante == 'bloques':
+        transformar_csv(entrada, salida)
+    else:
+        transformar_csv(entrada, salida, procesos=int(variante.split('x')[0]))
+    return time.perf_counter() - inicio, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark(filas: int = 5_000_000, procesos: int = 4) -> None:
+    """
+    Compara la lectura completa del Ejemplo 1 con la lectura por bloques, en un
+    proceso y en varios. Cada variante corre en un proceso nuevo para medir su pico
+    de memoria (con varios procesos, solo el del proceso principal).
+    """
+    import multiprocessing
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    with tempfile.TemporaryDirectory() as directorio:
+        entrada = os.path.join(directorio, 'productos.csv')
+        generar_productos(entrada, filas)
+        print(f"{filas} filas, {os.path.getsize(entrada) / 1e6:.0f} MB")
+        contexto = multiprocessing.get_context('spawn')
+        for variante in ('completo', 'bloques', f'{procesos}x procesos'):
+            salida = os.path.join(directorio, 'productos_transformados.csv')
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                segundos, pico = executor.submit(_medir_variante, variante, entrada, salida).result()
+            print(f"{variante:>12}: {segundos:.2f}s ({filas / segundos:,.0f} filas/s), pico RSS {pico / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transforma un CSV de productos por bloques")
+    parser.add_argument('entrada', nargs='?', default='productos.csv', help="CSV de origen")
+    parser.add_argument('salida', nargs='?', default='productos_transformados.csv', help="CSV de destino")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Filas por bloque")
+    parser.add_argument('--procesos', type=int, default=1, help="Procesos para transformar los bloques")
+    parser.add_argument('--dtype', action='append', default=[], metavar='COLUMNA=TIPO',
+                        help="Tipo explícito de una columna (se puede repetir)")
+    parser.add_argument('--tasa-iva', type=float, default=TASA_IVA, help="Multiplicador del IVA")
+    parser.add_argument('--formato', choices=['csv', 'parquet', 'ipc'], default='csv', help="Formato de salida")
+    parser.add_argument('--particiones', nargs='+', default=[], metavar='COLUMNA',
+                        help="Columnas de partición (solo parquet e ipc)")
+    parser.add_argument('--benchmark', type=int, metavar='FILAS',
+                        help="Compara lectura completa y por bloques con un CSV sintético")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, max(args.procesos, 4))
+    else:
+        tipos = dict(opcion.split('=', 1) for opcion in args.dtype)
+        inicio = time.perf_counter()
+        filas = transformar_csv(args.entrada, args.salida, args.chunksize, tipos, args.procesos, args.tasa_iva,
+                                args.formato, args.particiones)
+        print(f"{filas} filas transformadas en {time.perf_counter() - inicio:.2f}s -> '{args.salida}'")